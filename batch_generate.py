@@ -0,0 +1,117 @@
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from canonical import DedupIndex, puzzle_hash
+from sudoku_generator import SudokuGenerator, removed_for, board_to_line
+
+CHUNK_SIZE = 50
+
+
+def make_puzzle(size, difficulty, unique=False, seed=None):
+    # returns (puzzle, solution) as lists of lists; the same seed gives the same pair
+    generator = SudokuGenerator(size, removed_for(size, difficulty), seed)
+    generator.fill_values()
+    solution = [row[:] for row in generator.get_board()]
+    generator.remove_cells(unique)
+    return generator.get_board(), solution
+
+
+def format_puzzle(puzzle, solution, fmt):
+    if fmt == "jsonl":
+        return json.dumps({"puzzle": puzzle, "solution": solution}, separators=(",", ":"))
+    return board_to_line(puzzle) + " " + board_to_line(solution)
+
+
+def _generate_chunk(task):
+    # runs in a worker; sends back finished lines so only short strings cross the process boundary.
+    # When deduplicating, the canonical hash is computed here too, leaving the parent just the index lookup
+    count, size, difficulty, unique, fmt, keyed = task
+    lines = []
+    for _ in range(count):
+        puzzle, solution = make_puzzle(size, difficulty, unique)
+        line = format_puzzle(puzzle, solution, fmt)
+        lines.append((line, puzzle_hash(puzzle)) if keyed else line)
+    return lines
+
+
+def _tasks(count, size, difficulty, unique, fmt, chunk, keyed=False):
+    while count > 0:
+        step = min(chunk, count)
+        yield (step, size, difficulty, unique, fmt, keyed)
+        count -= step
+
+
+def _iter_chunks(tasks, workers):
+    if workers == 1:
+        for task in tasks:
+            yield _generate_chunk(task)
+        return
+    # each generator seeds its own Random from the OS, so forked workers don't repeat each other
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(_generate_chunk, tasks)
+
+
+def iter_batch(count, size=9, difficulty="medium", workers=None, unique=False, fmt="jsonl", chunk=CHUNK_SIZE,
+               index=None):
+    # yields formatted lines as they finish, in no particular order. With a DedupIndex, puzzles equivalent
+    # to one already in the index are dropped and replaced until count new ones are out, or a whole
+    # round turns up nothing new (the size/difficulty has run out of distinct puzzles)
+    if index is None:
+        for lines in _iter_chunks(_tasks(count, size, difficulty, unique, fmt, chunk), workers):
+            yield from lines
+        return
+    while count > 0:
+        added = 0
+        for pairs in _iter_chunks(_tasks(count, size, difficulty, unique, fmt, chunk, True), workers):
+            for line, key in pairs:
+                if index.add(key):
+                    added += 1
+                    yield line
+        if not added:
+            return
+        count -= added
+
+
+def generate_batch(count, size=9, difficulty="medium", workers=None, out=None, fmt="jsonl", unique=False,
+                   chunk=CHUNK_SIZE, index=None):
+    # streams count puzzles to out and returns (count, seconds)
+    out = out or sys.stdout
+    start = time.perf_counter()
+    written = 0
+    for line in iter_batch(count, size, difficulty, workers, unique, fmt, chunk, index):
+        out.write(line + "\n")
+        written += 1
+    return written, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate sudoku puzzles in bulk.")
+    parser.add_argument("-n", "--count", type=int, default=1000)
+    parser.add_argument("-s", "--size", type=int, default=9)
+    parser.add_argument("-d", "--difficulty", choices=["easy", "medium", "hard"], default="medium")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("-f", "--format", choices=["jsonl", "line"], default="jsonl")
+    parser.add_argument("-o", "--output", default="-", help="output file, - for stdout")
+    parser.add_argument("--unique", action="store_true", help="only dig cells that keep a single solution")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE, help="puzzles per worker task")
+    parser.add_argument("--dedup", metavar="INDEX", help="skip puzzles equivalent to any already in this index")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    index = DedupIndex(args.dedup) if args.dedup else None
+    try:
+        written, seconds = generate_batch(args.count, args.size, args.difficulty, args.workers, out,
+                                          args.format, args.unique, args.chunk, index)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if index is not None:
+            index.close()
+    rate = written / seconds if seconds else 0.0
+    print("%d puzzles in %.2fs (%.1f puzzles/sec)" % (written, seconds, rate), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import math
+import numpy as np
+from sudoku_generator import SYMBOLS
+
+# Every function takes an (N, n, n) integer array of boards, 0 for blanks, and works a chunk of
+# boards at a time so memory stays bounded however large N is.
+CHUNK = 1 << 16
+
+_UNITS = {}
+
+# byte value -> cell value, for decoding puzzle lines without a per-cell loop
+_DECODE = np.zeros(256, dtype=np.int8)
+for _value, _symbol in enumerate(SYMBOLS):
+    _DECODE[ord(_symbol)] = _value
+    _DECODE[ord(_symbol.lower())] = _value
+
+
+def unit_indices(n):
+    # (3n, n) flat cell indices: rows, then columns, then boxes
+    if n not in _UNITS:
+        b = int(math.sqrt(n))
+        cells = np.arange(n * n).reshape(n, n)
+        boxes = cells.reshape(b, b, b, b).transpose(0, 2, 1, 3).reshape(n, n)
+        _UNITS[n] = np.concatenate([cells, cells.T, boxes])
+    return _UNITS[n]
+
+
+def to_array(boards, dtype=np.int8):
+    # list of list-of-lists (e.g. from get_board()) -> (N, n, n); numpy does the copy in C
+    arr = np.asarray(boards, dtype=dtype)
+    if arr.ndim == 2:
+        arr = arr[np.newaxis]
+    return arr
+
+
+def to_boards(arr):
+    return np.asarray(arr).tolist()
+
+
+def lines_to_array(lines):
+    # puzzle strings as written by batch_generate (first field of each line) -> (N, n, n)
+    fields = [line.split()[0] for line in lines]
+    n = int(math.sqrt(len(fields[0])))
+    raw = np.frombuffer("".join(fields).encode("ascii"), dtype=np.uint8)
+    return _DECODE[raw].reshape(len(fields), n, n)
+
+
+def _chunked(fn, *arrays, chunk=CHUNK):
+    total = len(arrays[0])
+    if total <= chunk:
+        return fn(*arrays)
+    return np.concatenate([fn(*(a[i:i + chunk] for a in arrays)) for i in range(0, total, chunk)])
+
+
+def _units(boards):
+    n = boards.shape[-1]
+    return boards.reshape(len(boards), n * n)[:, unit_indices(n)]
+
+
+def _bits(boards):
+    values = boards.astype(np.int32)
+    return np.where(values > 0, np.left_shift(1, np.maximum(values - 1, 0)), 0)
+
+
+def _valid_solutions(boards):
+    # n cells whose digit bits OR to the full mask must hold n distinct digits
+    n = boards.shape[-1]
+    seen = np.bitwise_or.reduce(_units(_bits(boards)), axis=2)
+    in_range = (boards >= 1).all(axis=(1, 2)) & (boards <= n).all(axis=(1, 2))
+    return (seen == (1 << n) - 1).all(axis=1) & in_range
+
+
+def _consistent(boards):
+    # digit bits in a unit sum to their OR only when no bit appears twice
+    unit_bits = _units(_bits(boards))
+    repeats = unit_bits.sum(axis=2) != np.bitwise_or.reduce(unit_bits, axis=2)
+    in_range = (boards >= 0).all(axis=(1, 2)) & (boards <= boards.shape[-1]).all(axis=(1, 2))
+    return ~repeats.any(axis=1) & in_range
+
+
+def _matches(puzzles, solutions):
+    return ((puzzles == 0) | (puzzles == solutions)).all(axis=(1, 2))
+
+
+def valid_solutions(boards, chunk=CHUNK):
+    # True where a board is completely and correctly filled
+    return _chunked(_valid_solutions, to_array(boards), chunk=chunk)
+
+
+def consistent(boards, chunk=CHUNK):
+    # True where no digit repeats in any unit; blanks are allowed
+    return _chunked(_consistent, to_array(boards), chunk=chunk)
+
+
+def matches_solution(puzzles, solutions, chunk=CHUNK):
+    # True where every given agrees with the solution
+    return _chunked(_matches, to_array(puzzles), to_array(solutions), chunk=chunk)
+
+
+def _candidates(boards):
+    n = boards.shape[-1]
+    b = int(math.sqrt(n))
+    bits = _bits(boards)
+    rows = np.bitwise_or.reduce(bits, axis=2)[:, :, np.newaxis]
+    cols = np.bitwise_or.reduce(bits, axis=1)[:, np.newaxis, :]
+    boxes = np.bitwise_or.reduce(bits.reshape(-1, b, b, b, b), axis=(2, 4))
+    boxes = np.repeat(np.repeat(boxes, b, axis=1), b, axis=2)
+    free = ((1 << n) - 1) & ~(rows | cols | boxes)
+    return np.where(boards == 0, free, 0).astype(np.int32)
+
+
+def candidates(boards, chunk=CHUNK):
+    # (N, n, n) int32 masks, bit d - 1 set when digit d can go in an empty cell; 0 for filled cells
+    return _chunked(_candidates, to_array(boards), chunk=chunk)
+
+
+def popcount(masks):
+    # candidate counts per cell
+    masks = np.asarray(masks, dtype=np.uint32)
+    counts = np.zeros(masks.shape, dtype=np.uint8)
+    while masks.any():
+        counts += (masks & 1).astype(np.uint8)
+        masks = masks >> 1
+    return counts
@@ -0,0 +1,174 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")  # must be set before pygame creates a display
+
+from sudoku_generator import SudokuGenerator, removed_for
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+
+
+def summarize(samples):
+    # samples are seconds; the summary is in milliseconds
+    samples = sorted(samples)
+    n = len(samples)
+
+    def pct(p):
+        return samples[min(n - 1, int(p * n))] * 1000
+
+    total = sum(samples)
+    return {
+        "n": n,
+        "mean_ms": total / n * 1000,
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": samples[-1] * 1000,
+        "per_sec": n / total if total else 0.0,
+    }
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def bench_generation(sizes, repeat, unique):
+    results = {}
+    for size in sizes:
+        for difficulty in DIFFICULTIES:
+            fill, remove = [], []
+            for _ in range(repeat):
+                generator = SudokuGenerator(size, removed_for(size, difficulty))
+                start = time.perf_counter()
+                generator.fill_values()
+                mid = time.perf_counter()
+                generator.remove_cells(unique)
+                end = time.perf_counter()
+                fill.append(mid - start)
+                remove.append(end - mid)
+            results["fill_values/%dx%d/%s" % (size, size, difficulty)] = summarize(fill)
+            # labelled by mode: plain digging is far cheaper, so the two must never be compared
+            results["remove_cells/%dx%d/%s/%s" % (size, size, difficulty, "unique" if unique else "any")] = \
+                summarize(remove)
+    return results
+
+
+def bench_board(repeat):
+    # validation and drawing both need main.Board, which needs pygame
+    try:
+        import pygame
+        import main
+    except ImportError as e:
+        print("skipping Board benchmarks: %s" % e, file=sys.stderr)
+        return {}
+    pygame.init()
+    screen = pygame.display.set_mode((540, 600))
+    board = main.Board(540, 540, screen, "hard")
+    solution = board.solution
+    for row in range(9):
+        for col in range(9):
+            if board.model.get(row, col) == 0:
+                board.select(row, col)
+                board.place_number(solution[row][col])
+    results = {
+        "check_board": summarize(timed(board.check_board, repeat)),
+        "is_won": summarize(timed(board.is_won, repeat)),
+        "draw": summarize(timed(board.draw, repeat)),
+    }
+
+    cells = itertools.cycle([(row, col) for row in range(9) for col in range(9)])
+
+    def dirty_frame(): # A new cell every call, so each frame repaints the old and new selection
+        board.select(*next(cells))
+        board.draw_dirty()
+
+    results["draw_dirty"] = summarize(timed(dirty_frame, repeat))
+    pygame.quit()
+    return results
+
+
+def run(sizes, repeat, unique):
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeat": repeat,
+            "unique": unique,
+        },
+        "results": dict(bench_generation(sizes, repeat, unique), **bench_board(repeat)),
+    }
+
+
+def compare(old, new, threshold, metrics=("p50_ms", "p95_ms")):
+    # returns (name, metric, old, new, ratio) for every metric that got slower by more than threshold
+    regressions = []
+    for name, stats in new["results"].items():
+        before = old["results"].get(name)
+        if before is None:
+            continue
+        for metric in metrics:
+            if before[metric] > 0:
+                ratio = stats[metric] / before[metric]
+                if ratio > 1 + threshold:
+                    regressions.append((name, metric, before[metric], stats[metric], ratio))
+    return regressions
+
+
+def print_results(report):
+    print("%-36s %8s %9s %9s %9s %9s %10s" % ("benchmark", "n", "p50 ms", "p95 ms", "p99 ms", "max ms", "per sec"))
+    for name, s in report["results"].items():
+        print("%-36s %8d %9.3f %9.3f %9.3f %9.3f %10.1f" % (name, s["n"], s["p50_ms"], s["p95_ms"],
+                                                              s["p99_ms"], s["max_ms"], s["per_sec"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark generation, validation and drawing.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_cmd = sub.add_parser("run", help="run the suite (default)")
+    run_cmd.add_argument("-o", "--output", default="bench_results.json")
+    run_cmd.add_argument("-n", "--repeat", type=int, default=200)
+    run_cmd.add_argument("-s", "--sizes", type=int, nargs="+", default=[4, 9],
+                         help="grid sizes (16x16 unique digging takes seconds per puzzle)")
+    run_cmd.add_argument("--unique", action=argparse.BooleanOptionalAction, default=True,
+                         help="time uniqueness-checked digging, as the game does (default)")
+    cmp_cmd = sub.add_parser("compare", help="flag regressions between two result files")
+    cmp_cmd.add_argument("old")
+    cmp_cmd.add_argument("new")
+    cmp_cmd.add_argument("-t", "--threshold", type=float, default=0.10, help="allowed slowdown, 0.10 = 10%%")
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] not in ("run", "compare", "-h", "--help"):
+        argv.insert(0, "run")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        for name, metric, before, after, ratio in regressions:
+            print("REGRESSION %-36s %s %.3f -> %.3f ms (x%.2f)" % (name, metric, before, after, ratio))
+        if not regressions:
+            print("no regressions over %d%%" % (args.threshold * 100))
+        return 1 if regressions else 0
+
+    report = run(args.sizes, args.repeat, args.unique)
+    print_results(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+from batch_generate import make_puzzle
+from game import Game
+from solver import solve
+from sudoku_transform import transform_puzzle
+
+# Load test for the game rules: bots play headless Games across processes and every Game call (op) is timed.
+# Games come from a few seeded puzzles per worker, each one shuffled by a random symmetry, so setup stays cheap.
+BOTS = ("solver", "hint", "random")
+SEED_PUZZLES = 8
+GAMES_PER_TASK = 50
+MOVES = ("sketch", "note", "place", "clear", "undo", "redo", "reset")  # calls that can change the board
+
+
+class TimedGame:
+    # forwards calls to a Game and records how long each one took, per operation name; moves counts
+    # only the calls that changed the board (a refused place or an undo with nothing to undo don't)
+    def __init__(self, game, samples):
+        self.game = game
+        self.samples = samples
+        self.moves = 0
+
+    def __getattr__(self, name):
+        fn = getattr(self.game, name)
+        if not callable(fn):
+            return fn
+        samples = self.samples.setdefault(name, [])
+
+        def timed(*args):
+            start = time.perf_counter()
+            result = fn(*args)
+            samples.append(time.perf_counter() - start)
+            if name in MOVES and result is not False:
+                self.moves += 1
+            return result
+        return timed
+
+
+def play_solver(game, rng):
+    # fills the board from its own solve of the givens, in random order, sketching each digit first
+    original = game.game.original
+    solution = solve([list(row) for row in original])
+    cells = [(r, c) for r in range(game.game.size) for c in range(game.game.size) if not original[r][c]]
+    rng.shuffle(cells)
+    for row, col in cells:
+        game.select(row, col)
+        game.sketch(solution[row][col])
+        game.place(solution[row][col])
+
+
+def play_hint(game, rng):
+    # follows the hint engine, which sketches the next forced digit
+    while game.game.status == "playing":
+        if game.hint() is None:
+            break
+        game.place(game.game.model.sketches[game.game.selected_row * game.game.size + game.game.selected_col])
+
+
+def play_random(game, rng, moves=300):
+    # a careless player: random cells and digits, notes, clears, undo/redo and the odd reset
+    size = game.game.size
+    for _ in range(moves):
+        if game.game.status != "playing":
+            break
+        game.select(rng.randrange(size), rng.randrange(size))
+        roll = rng.random()
+        if roll < 0.35:
+            game.place(rng.randint(1, size))
+        elif roll < 0.6:
+            game.sketch(rng.randint(1, size))
+        elif roll < 0.75:
+            game.note(rng.randint(1, size))
+        elif roll < 0.85:
+            game.clear()
+        elif roll < 0.92:
+            game.undo()
+        elif roll < 0.99:
+            game.redo()
+        else:
+            game.reset()
+
+
+PLAYERS = {"solver": play_solver, "hint": play_hint, "random": play_random}
+
+
+def _run_task(task):
+    # one batch of games in a worker; returns (games, moves, errors, statuses, samples)
+    count, bot, size, difficulty, lives, seed = task
+    rng = random.Random(seed)
+    seeds = [make_puzzle(size, difficulty, True, rng.randrange(1 << 30)) for _ in range(SEED_PUZZLES)]
+    samples = {}
+    statuses = {}
+    errors = []
+    moves = 0
+    for _ in range(count):
+        puzzle, solution = transform_puzzle(*rng.choice(seeds), rng=rng)
+        game = TimedGame(Game(puzzle, solution, lives), samples)
+        PLAYERS[bot](game, rng)
+        moves += game.moves
+        status = game.game.status
+        statuses[status] = statuses.get(status, 0) + 1
+        # the solver and hint bots only ever play correct digits, so anything but a win is a rules bug
+        if bot != "random" and (status != "won" or not game.game.check()):
+            errors.append("%s bot finished %s" % (bot, status))
+        elif status == "won" and not game.game.check():
+            errors.append("won without a valid board")
+    return count, moves, errors, statuses, samples
+
+
+def _tasks(games, bot, size, difficulty, lives, seed, chunk):
+    rng = random.Random(seed)
+    while games > 0:
+        step = min(chunk, games)
+        yield (step, bot, size, difficulty, lives, rng.randrange(1 << 30))
+        games -= step
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def simulate(games, bot="solver", size=9, difficulty="medium", lives=None, workers=None, seed=None,
+             chunk=GAMES_PER_TASK):
+    # plays games across processes and returns a report dict
+    tasks = _tasks(games, bot, size, difficulty, lives, seed, chunk)
+    totals = {"games": 0, "moves": 0, "errors": [], "statuses": {}}
+    samples = {}
+    start = time.perf_counter()
+
+    def merge(result):
+        count, moves, errors, statuses, chunk_samples = result
+        totals["games"] += count
+        totals["moves"] += moves
+        totals["errors"] += errors
+        for status, n in statuses.items():
+            totals["statuses"][status] = totals["statuses"].get(status, 0) + n
+        for name, times in chunk_samples.items():
+            samples.setdefault(name, []).extend(times)
+
+    if workers == 1:
+        for task in tasks:
+            merge(_run_task(task))
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            for result in pool.imap_unordered(_run_task, tasks):
+                merge(result)
+    seconds = time.perf_counter() - start
+    ops = sum(len(times) for times in samples.values())
+    operations = {}
+    for name, times in sorted(samples.items()):
+        times.sort()
+        operations[name] = {"count": len(times), "p50_us": _percentile(times, 0.5) * 1e6,
+                            "p95_us": _percentile(times, 0.95) * 1e6, "p99_us": _percentile(times, 0.99) * 1e6,
+                            "max_us": times[-1] * 1e6}
+    return {"bot": bot, "size": size, "difficulty": difficulty, "lives": lives, "seconds": seconds,
+            "games": totals["games"], "games_per_sec": totals["games"] / seconds if seconds else 0.0,
+            "ops": ops, "ops_per_sec": ops / seconds if seconds else 0.0,
+            "moves": totals["moves"], "moves_per_sec": totals["moves"] / seconds if seconds else 0.0,
+            "statuses": totals["statuses"], "errors": totals["errors"][:20], "error_count": len(totals["errors"]),
+            "operations": operations}
+
+
+def print_report(report, out=sys.stdout):
+    out.write("%d %s games (%dx%d %s) in %.2fs: %.0f games/sec, %.0f moves/sec, %.0f ops/sec\n" % (
+        report["games"], report["bot"], report["size"], report["size"], report["difficulty"], report["seconds"],
+        report["games_per_sec"], report["moves_per_sec"], report["ops_per_sec"]))
+    out.write("outcomes: %s\n" % ", ".join("%s %d" % item for item in sorted(report["statuses"].items())))
+    out.write("%-12s %10s %10s %10s %10s %10s\n" % ("operation", "count", "p50 us", "p95 us", "p99 us", "max us"))
+    for name, op in report["operations"].items():
+        out.write("%-12s %10d %10.1f %10.1f %10.1f %10.1f\n" % (
+            name, op["count"], op["p50_us"], op["p95_us"], op["p99_us"], op["max_us"]))
+    for error in report["errors"]:
+        out.write("error: %s\n" % error)
+    if report["error_count"] > len(report["errors"]):
+        out.write("... %d errors in all\n" % report["error_count"])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play bot games against the headless game engine.")
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("-b", "--bot", choices=BOTS, default="solver")
+    parser.add_argument("-s", "--size", type=int, default=9)
+    parser.add_argument("-d", "--difficulty", choices=["easy", "medium", "hard"], default="medium")
+    parser.add_argument("-l", "--lives", type=int, default=None, help="lives per game (default: none)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=None, help="repeat a run exactly")
+    parser.add_argument("--chunk", type=int, default=GAMES_PER_TASK, help="games per worker task")
+    parser.add_argument("-o", "--output", help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = simulate(args.games, args.bot, args.size, args.difficulty, args.lives, args.workers, args.seed,
+                      args.chunk)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return 1 if report["error_count"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,312 @@
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from collections import Counter
+from itertools import chain
+from sudoku_generator import line_to_board, board_to_line
+
+# Canonical form under the sudoku symmetries: digit relabeling, row swaps within a band, band swaps,
+# column swaps within a stack, stack swaps and transposition. Among the transformed copies whose row and column
+# signatures (see _signatures) come in the smallest order, the form is the smallest row-major reading, with
+# blanks as 0 and digits renumbered in order of first appearance.
+# Two puzzles are equivalent exactly when their canonical forms match.
+HASH_BYTES = 8
+
+
+def _blank_first(candidates, blank, box):
+    # all-blank lines in the same band/stack are interchangeable, so only the first one needs trying
+    if not blank:
+        return candidates
+    kept = []
+    seen = set()
+    for line in candidates:
+        if line in blank:
+            if line // box in seen:
+                continue
+            seen.add(line // box)
+        kept.append(line)
+    return kept
+
+
+def _signatures(grid, n, box):
+    # per row and per column, a signature no symmetry changes: its given count, and for each of its givens the
+    # given counts of the crossing line and of the box, sorted
+    rows = [sum(1 for v in row if v) for row in grid]
+    cols = [sum(1 for row in grid if row[c]) for c in range(n)]
+    boxes = [0] * n
+    for r in range(n):
+        for c in range(n):
+            if grid[r][c]:
+                boxes[r // box * box + c // box] += 1
+    # On full grids those all tie, so each line also carries, for each box-wide stretch of it, how many stretches
+    # in all lines hold the same set of digits
+    row_sets = [[frozenset(grid[r][s:s + box]) for s in range(0, n, box)] for r in range(n)]
+    col_sets = [[frozenset(grid[i][c] for i in range(s, s + box)) for s in range(0, n, box)] for c in range(n)]
+    row_seen = Counter(chain.from_iterable(row_sets))
+    col_seen = Counter(chain.from_iterable(col_sets))
+    row_sig = [(rows[r], tuple(sorted(row_seen[x] for x in row_sets[r])),
+                tuple(sorted((cols[c], boxes[r // box * box + c // box]) for c in range(n) if grid[r][c])))
+               for r in range(n)]
+    col_sig = [(cols[c], tuple(sorted(col_seen[x] for x in col_sets[c])),
+                tuple(sorted((rows[r], boxes[r // box * box + c // box]) for r in range(n) if grid[r][c])))
+               for c in range(n)]
+    return row_sig, col_sig
+
+
+def _smallest_order(sig, n, box):
+    # the smallest signature sequence any band and row order can give: rows sorted within each band,
+    # bands sorted by their sorted rows
+    bands = sorted(tuple(sorted(sig[b * box:b * box + box])) for b in range(n // box))
+    return [s for band in bands for s in band]
+
+
+def _line_options(chosen, i, sig, target, box, n):
+    # lines that can go at position i and still read target: in the current band/stack once one is started,
+    # otherwise the first line of a band/stack whose sorted signatures match the next box of target
+    if i % box:
+        group = chosen[-1] // box
+        return [x for x in range(group * box, group * box + box) if x not in chosen and sig[x] == target[i]]
+    used = {x // box for x in chosen}
+    want = sorted(target[i:i + box])
+    return [x for x in range(n) if x // box not in used and sig[x] == target[i]
+            and sorted(sig[x // box * box:x // box * box + box]) == want]
+
+
+def canonical_form(board):
+    # returns the canonical grid as a tuple of tuples
+    n = len(board)
+    box = int(math.sqrt(n))
+    # Transforms are ranked by their row signatures, then column signatures, then the reading, so the search
+    # only branches over lines whose signatures tie. Each layout is (grid, blank lines, row signatures,
+    # column signatures, row target, column target), for the board and its transpose if they rank the same
+    layouts = []
+    for grid in (board, [list(col) for col in zip(*board)]):
+        row_sig, col_sig = _signatures(grid, n, box)
+        blank = ({r for r in range(n) if not row_sig[r][0]}, {c for c in range(n) if not col_sig[c][0]})
+        layouts.append((grid, blank, row_sig, col_sig, _smallest_order(row_sig, n, box),
+                        _smallest_order(col_sig, n, box)))
+    best_targets = min(layout[4:] for layout in layouts)
+    layouts = [layout for layout in layouts if layout[4:] == best_targets]
+
+    # states are (layout, row order, column order, relabel); every state in the list reads the same prefix
+    # so far, and a step keeps only the candidates whose next value is smallest
+    states = []
+    for layout in layouts:
+        grid, blank, row_sig, col_sig, row_target, col_target = layout
+        full_bands = set()
+        for r in _blank_first(_line_options([], 0, row_sig, row_target, box, n), blank[0], box):
+            # a completely blank band is also interchangeable with any other completely blank band
+            band = r // box
+            if not any(row_sig[i][0] for i in range(band * box, band * box + box)):
+                if full_bands:
+                    continue
+                full_bands.add(band)
+            states.append((layout, [r], [], {}))
+
+    # first row: pick the column order one position at a time
+    for k in range(n):
+        best = None
+        kept = []
+        for layout, rows, cols, relabel in states:
+            grid, blank, row_sig, col_sig, row_target, col_target = layout
+            options = _blank_first(_line_options(cols, k, col_sig, col_target, box, n), blank[1], box)
+            for c in options:
+                v = grid[rows[0]][c]
+                label = relabel.get(v, len(relabel) + 1) if v else 0
+                if best is None or label < best:
+                    best = label
+                    kept = []
+                if label == best:
+                    labels = relabel
+                    if v and v not in relabel:
+                        labels = dict(relabel)
+                        labels[v] = label
+                    kept.append((layout, rows, cols + [c], labels))
+        states = kept
+    layout, rows, cols, relabel = states[0]
+    prefix = [tuple(relabel.get(layout[0][rows[0]][c], 0) for c in cols)]
+
+    # remaining rows: pick whole rows, each candidate read through the fixed column order
+    for i in range(1, n):
+        best = None
+        kept = []
+        for layout, rows, cols, relabel in states:
+            grid, blank, row_sig, col_sig, row_target, col_target = layout
+            for r in _blank_first(_line_options(rows, i, row_sig, row_target, box, n), blank[0], box):
+                line = grid[r]
+                labels = dict(relabel)
+                out = []
+                for c in cols:
+                    v = line[c]
+                    if v:
+                        if v not in labels:
+                            labels[v] = len(labels) + 1
+                        out.append(labels[v])
+                    else:
+                        out.append(0)
+                out = tuple(out)
+                if best is None or out < best:
+                    best = out
+                    kept = []
+                if out == best:
+                    kept.append((layout, rows + [r], cols, labels))
+        states = kept
+        prefix.append(best)
+    return tuple(prefix)
+
+
+def puzzle_hash(board):
+    # compact fingerprint of the canonical form; equal for every equivalent puzzle
+    form = canonical_form(board)
+    return hashlib.blake2b(bytes(v for row in form for v in row), digest_size=HASH_BYTES).digest()
+
+
+# Dedup index file: header, then a power-of-two table of HASH_BYTES slots probed linearly (all zero = empty).
+# The table doubles once it is half full, so a lookup touches one or two slots however many puzzles it holds.
+MAGIC = b"SDKX"
+VERSION = 1
+HEADER = struct.Struct("<4sBxxxQQ")  # magic, version, slot count, stored hashes
+INITIAL_SLOTS = 1 << 16
+EMPTY = bytes(HASH_BYTES)
+
+
+class DedupIndex:
+    def __init__(self, path, slots=INITIAL_SLOTS):
+        self.path = path
+        if not os.path.exists(path):
+            self._create(path, slots)
+        self._open()
+
+    @staticmethod
+    def _create(path, slots):
+        with open(path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, slots, 0))
+            f.truncate(HEADER.size + slots * HASH_BYTES)
+
+    def _open(self):
+        self.file = open(self.path, "r+b")
+        self.data = mmap.mmap(self.file.fileno(), 0)
+        magic, version, self.slots, self.count = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d dedup index" % (self.path, VERSION))
+        self.mask = self.slots - 1
+
+    def _find(self, key):
+        # offset of key's slot, or of the empty slot where it would go
+        slot = int.from_bytes(key, "little") & self.mask
+        while True:
+            offset = HEADER.size + slot * HASH_BYTES
+            stored = self.data[offset:offset + HASH_BYTES]
+            if stored == key or stored == EMPTY:
+                return offset, stored == key
+            slot = (slot + 1) & self.mask
+
+    @staticmethod
+    def _key(key):
+        return EMPTY[:-1] + b"\1" if key == EMPTY else key
+
+    def __contains__(self, key):
+        return self._find(self._key(key))[1]
+
+    def __len__(self):
+        return self.count
+
+    def add(self, key):
+        # True if key was new and is now stored, False if an equivalent puzzle was already there
+        key = self._key(key)
+        offset, found = self._find(key)
+        if found:
+            return False
+        self.data[offset:offset + HASH_BYTES] = key
+        self.count += 1
+        HEADER.pack_into(self.data, 0, MAGIC, VERSION, self.slots, self.count)
+        if self.count * 2 > self.slots:
+            self._grow()
+        return True
+
+    def _grow(self):
+        # rehash into a table twice the size, built beside the index and swapped in when complete
+        table = self.data[HEADER.size:]
+        path = self.path
+        self.close()
+        self.path = path + ".tmp"
+        self._create(self.path, self.slots * 2)
+        self._open()
+        for offset in range(0, len(table), HASH_BYTES):
+            key = table[offset:offset + HASH_BYTES]
+            if key != EMPTY:
+                slot = self._find(key)[0]
+                self.data[slot:slot + HASH_BYTES] = key
+                self.count += 1
+        HEADER.pack_into(self.data, 0, MAGIC, VERSION, self.slots, self.count)
+        self.close()
+        os.replace(self.path, path)
+        self.path = path
+        self._open()
+
+    def close(self):
+        self.data.flush()
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def import_lines(lines, index):
+    # yields the lines whose puzzle (first field) is new to the index, recording each as it passes
+    for line in lines:
+        fields = line.split()
+        if fields and index.add(puzzle_hash(line_to_board(fields[0]))):
+            yield line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Canonical forms and the puzzle dedup index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="add puzzles to an index, writing out only the new ones")
+    imp.add_argument("index")
+    imp.add_argument("input", nargs="?", default="-", help="one puzzle per line, optionally followed by its solution")
+    imp.add_argument("-o", "--output", default="-")
+    form = sub.add_parser("form", help="print the canonical form and hash of each puzzle")
+    form.add_argument("input", nargs="?", default="-")
+    info = sub.add_parser("info", help="show how many puzzles an index holds")
+    info.add_argument("index")
+    args = parser.parse_args(argv)
+
+    if args.command == "info":
+        with DedupIndex(args.index) as index:
+            print("%d puzzles, %d slots" % (len(index), index.slots))
+        return
+    source = sys.stdin if args.input == "-" else open(args.input)
+    try:
+        if args.command == "form":
+            for line in source:
+                if line.split():
+                    board = line_to_board(line.split()[0])
+                    print(board_to_line(canonical_form(board)), puzzle_hash(board).hex())
+            return
+        out = sys.stdout if args.output == "-" else open(args.output, "w")
+        total = kept = 0
+        with DedupIndex(args.index) as index:
+            for line in import_lines(source, index):
+                out.write(line if line.endswith("\n") else line + "\n")
+                kept += 1
+            total = index.count
+        if out is not sys.stdout:
+            out.close()
+        print("%d new puzzles, index now holds %d" % (kept, total), file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from itertools import islice
+
 WIDTH = 540
 HEIGHT = 600
 LINE_WIDTH = 1
@@ -14,3 +16,10 @@ LINE_COLOR = (0, 0, 0)
 CROSS_COLOR = (66, 66, 66)
 NUMBER_FONT = 60
 GAME_OVER_FONT = 40
+N_CELLS = 9 # Cells per row/column for the table.Table layout
+CELL_SIZE = (SQUARE_SIZE, SQUARE_SIZE)
+
+
+def convert_list(lst, var_lst): # Split lst into consecutive rows with the lengths in var_lst
+    it = iter(lst)
+    return [list(islice(it, i)) for i in var_lst]
@@ -0,0 +1,249 @@
+from itertools import chain
+from board_model import BoardModel, LOCKED, SELECTED, CONFLICT
+from hints import HintEngine
+from sudoku_generator import unit_tables, check_board
+
+# The game rules with no pygame in sight: selecting, sketching, noting, placing and clearing digits,
+# undo/redo, reset, lives and the won/lost state. main.Board and table.Table draw a Game; bot_sim.py plays it.
+# Many sessions share a process, so per-game state is flat buffers: the BoardModel, the givens and answers as
+# bytes, and the hint engine's per-unit digit counts, which the conflict and win checks read too.
+
+
+class Game:
+    __slots__ = ("size", "box_length", "box_index", "peers", "model", "givens", "answers", "max_lives", "lives",
+                 "selected_row", "selected_col", "history", "redo_log", "changed", "watch_peers", "hints")
+
+    def __init__(self, puzzle, solution, lives=None):
+        self.size = len(puzzle)
+        self.box_length, self.box_index, self.peers = unit_tables(self.size)
+        self.model = BoardModel.from_board(puzzle) # Givens come in locked
+        self.givens = bytes(self.model.values) # Immutable snapshot of the givens, row-major
+        self.answers = bytes(chain.from_iterable(solution))
+        self.max_lives = lives
+        self.lives = lives # None: no lives, a full board decides the game
+        self.selected_row = None
+        self.selected_col = None
+        self.history = [] # Moves, newest last; a move is a list of (row, col, before, after) cell states
+        self.redo_log = []
+        self.changed = set() # Cells that look different since the view last emptied this
+        self.watch_peers = False # Also report peers of changed cells, for views that draw candidates
+        self.hints = HintEngine(self.model, self.answers) # Candidates, hints and the running digit counts
+        for row in range(self.size):
+            for col in range(self.size):
+                self._update_conflict(row, col)
+
+    def _rows(self, flat):
+        n = self.size
+        return tuple(tuple(flat[r * n:(r + 1) * n]) for r in range(n))
+
+    @property
+    def original(self): # The givens as rows, built on demand
+        return self._rows(self.givens)
+
+    @property
+    def solution(self):
+        return self._rows(self.answers)
+
+    # --- cell state: (value, sketch, locked, pencil marks) ---
+
+    def _state(self, row, col):
+        i = row * self.size + col
+        model = self.model
+        return (model.values[i], model.sketches[i], model.flags[i] & LOCKED, model.marks[i])
+
+    def _set_state(self, row, col, state):
+        i = row * self.size + col
+        model = self.model
+        old = model.values[i]
+        model.values[i], model.sketches[i], locked, model.marks[i] = state
+        model.flags[i] = (model.flags[i] & ~LOCKED & 0xFF) | locked
+        self.changed.add((row, col))
+        if old != model.values[i]:
+            self._value_changed(row, col, old, model.values[i])
+
+    def _commit(self, cells):
+        # cells is [(row, col, new state)]; whatever actually changes becomes one undoable move
+        move = []
+        for row, col, after in cells:
+            before = self._state(row, col)
+            if before != after:
+                move.append((row, col, before, after))
+                self._set_state(row, col, after)
+        if move:
+            self.history.append(move)
+            self.redo_log.clear()
+        return bool(move)
+
+    def _editable(self):
+        # the selected cell if it can be changed, else None
+        if self.selected_row is None:
+            return None
+        row, col = self.selected_row, self.selected_col
+        if self.model.flags[row * self.size + col] & LOCKED:
+            return None
+        return row, col
+
+    # --- running digit counts (kept by the hint engine), so conflicts and the win check cost O(1) per move ---
+
+    @property
+    def filled(self):
+        return self.hints.filled
+
+    @property
+    def duplicates(self): # (unit, digit) pairs that appear more than once
+        return self.hints.duplicates
+
+    @property
+    def conflicts(self): # Cells whose digit repeats in their row, column or box
+        n = self.size
+        return {divmod(i, n) for i, flag in enumerate(self.model.flags) if flag & CONFLICT}
+
+    def _update_conflict(self, row, col):
+        i = row * self.size + col
+        value = self.model.values[i]
+        clash = value != 0 and self.hints.repeated(row, col, value)
+        if clash != bool(self.model.flags[i] & CONFLICT):
+            if clash:
+                self.model.flags[i] |= CONFLICT
+            else:
+                self.model.flags[i] &= ~CONFLICT & 0xFF
+            self.changed.add((row, col))
+
+    def _value_changed(self, row, col, old, new):
+        self.hints.set_value(row, col, old, new)
+        if self.watch_peers: # Peers' candidates changed
+            self.changed.update(self.peers[row][col])
+        # Only this cell and peers holding the old or new digit can change conflict status
+        self._update_conflict(row, col)
+        for r, c in self.peers[row][col]:
+            value = self.model.get(r, c)
+            if value and value in (old, new):
+                self._update_conflict(r, c)
+
+    # --- moves ---
+
+    def select(self, row, col):
+        if not (0 <= row < self.size and 0 <= col < self.size):
+            raise IndexError("no cell at row %d, column %d" % (row, col))
+        if self.selected_row is not None:
+            self.model.flags[self.selected_row * self.size + self.selected_col] &= ~SELECTED & 0xFF
+            self.changed.add((self.selected_row, self.selected_col))
+        self.selected_row = row
+        self.selected_col = col
+        self.model.flags[row * self.size + col] |= SELECTED
+        self.changed.add((row, col))
+
+    def sketch(self, value):
+        cell = self._editable()
+        if cell is None:
+            return False
+        row, col = cell
+        value_now, sketch, locked, marks = self._state(row, col)
+        return self._commit([(row, col, (value_now, value, locked, marks))])
+
+    def note(self, value):
+        # pencil mark on an empty cell, only for a digit its row, column and box still allow
+        cell = self._editable()
+        if cell is None or not self.hints.candidates(*cell) & (1 << (value - 1)):
+            return False
+        row, col = cell
+        value_now, sketch, locked, marks = self._state(row, col)
+        return self._commit([(row, col, (value_now, sketch, locked, marks | (1 << (value - 1))))])
+
+    def place(self, value):
+        # a placed digit locks; with lives, a wrong one costs a life and stays unlocked so it can be cleared.
+        # Without lives a wrong digit locks too, so placing and clearing can't be used to probe for answers
+        cell = self._editable()
+        if cell is None or not value:
+            return False
+        row, col = cell
+        correct = value == self.answers[row * self.size + col]
+        locked = LOCKED if correct or self.lives is None else 0
+        cells = [(row, col, (value, 0, locked, 0))]
+        if correct: # The digit is settled, so peers' pencil marks for it go
+            bit = 1 << (value - 1)
+            for r, c in self.peers[row][col]:
+                state = self._state(r, c)
+                if state[3] & bit:
+                    cells.append((r, c, state[:3] + (state[3] & ~bit,)))
+        if not self._commit(cells):
+            return False
+        if not correct and self.lives is not None:
+            self.lives -= 1
+        return True
+
+    def clear(self):
+        # empties whatever the player put in the selected cell; givens and locked digits stay
+        cell = self._editable()
+        if cell is None:
+            return False
+        row, col = cell
+        return self._commit([(row, col, (0, 0, 0, 0))])
+
+    def undo(self):
+        # board state only: a life lost to a wrong digit stays lost, and redoing that digit doesn't cost another
+        if not self.history:
+            return False
+        move = self.history.pop()
+        for row, col, before, after in reversed(move):
+            self._set_state(row, col, before)
+        self.redo_log.append(move)
+        return True
+
+    def redo(self):
+        if not self.redo_log:
+            return False
+        move = self.redo_log.pop()
+        for row, col, before, after in move:
+            self._set_state(row, col, after)
+        self.history.append(move)
+        return True
+
+    def reset(self):
+        # back to the givens with full lives, only touching cells that differ from them
+        for i, value in enumerate(self.givens):
+            row, col = divmod(i, self.size)
+            state = (value, 0, LOCKED if value else 0, 0)
+            if self._state(row, col) != state:
+                self._set_state(row, col, state)
+        self.history.clear()
+        self.redo_log.clear()
+        if self.selected_row is not None:
+            self.model.flags[self.selected_row * self.size + self.selected_col] &= ~SELECTED & 0xFF
+            self.changed.add((self.selected_row, self.selected_col))
+        self.selected_row = None
+        self.selected_col = None
+        self.lives = self.max_lives
+
+    def hint(self):
+        # selects the next forced cell and sketches its digit; returns the reason, or None when complete
+        found = self.hints.hint()
+        if found is None:
+            return None
+        row, col, value, reason = found
+        self.select(row, col)
+        if value:
+            self.sketch(value)
+        return reason
+
+    def candidates(self, row, col):
+        return self.hints.candidate_list(row, col)
+
+    # --- outcome ---
+
+    def is_full(self):
+        return self.filled == self.size * self.size
+
+    def is_won(self): # Full with no repeated digits, from the running counts
+        return self.is_full() and self.duplicates == 0
+
+    @property
+    def status(self):
+        if self.is_won():
+            return "won"
+        if self.lives is not None:
+            return "lost" if self.lives <= 0 else "playing"
+        return "lost" if self.is_full() else "playing"
+
+    def check(self): # Full scan; is_won() gives the same answer from the running counts
+        return check_board(self.model.to_board())
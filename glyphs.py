@@ -0,0 +1,47 @@
+import pygame
+import profiler
+
+# style -> (font name, use SysFont, font size as a fraction of the cell size, color)
+STYLES = {
+    'given': (None, False, 0.6, (0, 0, 0)),      # main.Cell values
+    'conflict': (None, False, 0.6, (255, 0, 0)),  # main.Cell repeated digits
+    'sketch': (None, False, 0.3, (128, 128, 128)),  # main.Cell sketches
+    'candidate': (None, False, 0.3, (170, 170, 200)),  # main.Board candidate display
+    'correct': ('monospace', True, 1.0, (0, 0, 0)),  # cell.Cell right answers
+    'wrong': ('monospace', True, 1.0, (255, 0, 0)),  # cell.Cell wrong answers
+    'guess': ('monospace', True, 1.0, (255, 165, 0)),  # cell.Cell pencil marks, sized to their 1/SRN slot
+}
+
+_fonts = {}
+_surfaces = {}
+
+
+def font(name=None, size=36, sysfont=False):
+    # each font is loaded once per process
+    key = (name, size, sysfont)
+    if key not in _fonts:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        _fonts[key] = pygame.font.SysFont(name, size) if sysfont else pygame.font.Font(name, size)
+    return _fonts[key]
+
+
+def text(label, size=36, color=(0, 0, 0), name=None, sysfont=False):
+    # rendered once, then every later call is a dict lookup
+    key = (label, size, color, name, sysfont)
+    surface = _surfaces.get(key)
+    if surface is None:
+        with profiler.span("glyphs.render"):
+            surface = font(name, size, sysfont).render(str(label), True, color)
+        _surfaces[key] = surface
+    return surface
+
+
+def digit(value, style, cell_size):
+    name, sysfont, scale, color = STYLES[style]
+    return text(value, int(cell_size * scale), color, name, sysfont)
+
+
+def clear():
+    _surfaces.clear()
+    _fonts.clear()
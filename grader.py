@@ -0,0 +1,356 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from itertools import combinations
+from sudoku_generator import unit_tables, line_to_board
+
+# techniques in the order they are tried, cheapest first, with the score each application adds
+TECHNIQUES = [
+    ('naked_single', 1),
+    ('hidden_single', 2),
+    ('pointing', 4),
+    ('claiming', 4),
+    ('naked_pair', 5),
+    ('hidden_pair', 6),
+    ('naked_triple', 7),
+    ('hidden_triple', 8),
+    ('x_wing', 10),
+    ('swordfish', 14),
+]
+WEIGHTS = dict(TECHNIQUES)
+RANK = {name: i for i, (name, _) in enumerate(TECHNIQUES)}
+
+# the hardest technique a puzzle needs decides its tier
+TIERS = {
+    'naked_single': 'easy',
+    'hidden_single': 'medium',
+    'pointing': 'hard',
+    'claiming': 'hard',
+    'naked_pair': 'hard',
+    'hidden_pair': 'hard',
+    'naked_triple': 'hard',
+    'hidden_triple': 'hard',
+    'x_wing': 'expert',
+    'swordfish': 'expert',
+}
+
+_LAYOUTS = {}
+
+
+def _layout(size):
+    # flat-index versions of the generator's unit tables, built once per size
+    if size not in _LAYOUTS:
+        box_length, box_index, peers = unit_tables(size)
+        rows = [tuple(r * size + c for c in range(size)) for r in range(size)]
+        cols = [tuple(r * size + c for r in range(size)) for c in range(size)]
+        boxes = [[] for _ in range(size)]
+        for r in range(size):
+            for c in range(size):
+                boxes[box_index[r][c]].append(r * size + c)
+        boxes = [tuple(box) for box in boxes]
+        flat_peers = [tuple(pr * size + pc for pr, pc in peers[r][c]) for r in range(size) for c in range(size)]
+        cell_box = [box_index[i // size][i % size] for i in range(size * size)]
+        _LAYOUTS[size] = (rows, cols, boxes, rows + cols + boxes, flat_peers, cell_box)
+    return _LAYOUTS[size]
+
+
+class Grade:
+    def __init__(self, solved, score, hardest, steps, board):
+        self.solved = solved
+        self.score = score
+        self.hardest = hardest  # None when only givens were needed
+        self.steps = steps  # technique -> times applied
+        self.board = board  # as far as the techniques got
+
+    @property
+    def tier(self):
+        if not self.solved:
+            return 'unsolvable'  # needs guessing or techniques past swordfish
+        return TIERS.get(self.hardest, 'easy')
+
+    def __repr__(self):
+        return "Grade(%s, score=%d, hardest=%s)" % (self.tier, self.score, self.hardest)
+
+
+class _Grader:
+    def __init__(self, board):
+        self.size = len(board)
+        self.rows, self.cols, self.boxes, self.units, self.peers, self.cell_box = _layout(self.size)
+        full = (1 << self.size) - 1
+        self.values = [v for row in board for v in row]
+        self.cands = [0 if v else full for v in self.values]
+        self.broken = False
+        for i, v in enumerate(self.values):
+            if v:
+                self._eliminate_peers(i, 1 << (v - 1))
+
+    def _eliminate_peers(self, i, bit):
+        cands = self.cands
+        values = self.values
+        for p in self.peers[i]:
+            if cands[p] & bit:
+                cands[p] &= ~bit
+                if not cands[p] and not values[p]:
+                    self.broken = True
+
+    def _place(self, i, bit):
+        self.values[i] = bit.bit_length()
+        self.cands[i] = 0
+        self._eliminate_peers(i, bit)
+
+    def _eliminate(self, cells, mask):
+        # removes mask from cells, reporting whether anything changed
+        changed = False
+        cands = self.cands
+        for i in cells:
+            if cands[i] & mask:
+                cands[i] &= ~mask
+                changed = True
+                if not cands[i]:
+                    self.broken = True
+        return changed
+
+    def naked_single(self):
+        placed = 0
+        cands = self.cands
+        for i, c in enumerate(cands):
+            if c and not c & (c - 1):
+                self._place(i, c)
+                placed += 1
+        return placed
+
+    def hidden_single(self):
+        placed = 0
+        cands = self.cands
+        values = self.values
+        full = (1 << self.size) - 1
+        for unit in self.units:
+            once = twice = done = 0
+            for i in unit:
+                c = cands[i]
+                twice |= once & c
+                once |= c
+                if values[i]:
+                    done |= 1 << (values[i] - 1)
+            if full & ~(once | done):  # a digit with nowhere left to go in this unit
+                self.broken = True
+                return placed
+            only = once & ~twice
+            while only:
+                bit = only & -only
+                only ^= bit
+                for i in unit:
+                    if cands[i] & bit:
+                        self._place(i, bit)
+                        placed += 1
+                        break
+                else:  # two digits whose only spot is the same cell
+                    self.broken = True
+                    return placed
+        return placed
+
+    def _naked(self, k):
+        found = 0
+        cands = self.cands
+        for unit in self.units:
+            small = [i for i in unit if cands[i] and bin(cands[i]).count("1") <= k]
+            if len(small) < k:
+                continue
+            for group in combinations(small, k):
+                union = 0
+                for i in group:
+                    union |= cands[i]
+                if bin(union).count("1") == k:
+                    if self._eliminate([i for i in unit if i not in group], union):
+                        found += 1
+        return found
+
+    def _hidden(self, k):
+        found = 0
+        cands = self.cands
+        for unit in self.units:
+            positions = {}
+            for i in unit:
+                c = cands[i]
+                while c:
+                    bit = c & -c
+                    c ^= bit
+                    positions.setdefault(bit, []).append(i)
+            spots = {bit: cells for bit, cells in positions.items() if 2 <= len(cells) <= k}
+            if len(spots) < k:
+                continue
+            for digits in combinations(spots, k):
+                cells = set()
+                for bit in digits:
+                    cells.update(spots[bit])
+                if len(cells) == k:
+                    keep = sum(digits)
+                    if any(cands[i] & ~keep for i in cells):
+                        for i in cells:
+                            cands[i] &= keep
+                        found += 1
+        return found
+
+    def naked_pair(self):
+        return self._naked(2)
+
+    def naked_triple(self):
+        return self._naked(3)
+
+    def hidden_pair(self):
+        return self._hidden(2)
+
+    def hidden_triple(self):
+        return self._hidden(3)
+
+    def pointing(self):
+        # a digit confined to one row or column inside a box leaves the rest of that line
+        found = 0
+        size = self.size
+        cands = self.cands
+        for box in self.boxes:
+            for d in range(size):
+                bit = 1 << d
+                cells = [i for i in box if cands[i] & bit]
+                if len(cells) < 2:
+                    continue
+                r = cells[0] // size
+                c = cells[0] % size
+                if all(i // size == r for i in cells):
+                    line = self.rows[r]
+                elif all(i % size == c for i in cells):
+                    line = self.cols[c]
+                else:
+                    continue
+                if self._eliminate([i for i in line if i not in cells], bit):
+                    found += 1
+        return found
+
+    def claiming(self):
+        # a digit confined to one box inside a row or column leaves the rest of that box
+        found = 0
+        cands = self.cands
+        for line in self.rows + self.cols:
+            for d in range(self.size):
+                bit = 1 << d
+                cells = [i for i in line if cands[i] & bit]
+                if len(cells) < 2:
+                    continue
+                b = self.cell_box[cells[0]]
+                if all(self.cell_box[i] == b for i in cells):
+                    if self._eliminate([i for i in self.boxes[b] if i not in cells], bit):
+                        found += 1
+        return found
+
+    def _fish(self, k):
+        found = 0
+        size = self.size
+        cands = self.cands
+        for bit in (1 << d for d in range(size)):
+            for lines, cross in ((self.rows, self.cols), (self.cols, self.rows)):
+                # per base line, a mask of the cross lines where the digit can go
+                base = []
+                for n, line in enumerate(lines):
+                    spots = 0
+                    for pos, i in enumerate(line):
+                        if cands[i] & bit:
+                            spots |= 1 << pos
+                    if 2 <= bin(spots).count("1") <= k:
+                        base.append((n, spots))
+                for group in combinations(base, k):
+                    cover = 0
+                    for _, spots in group:
+                        cover |= spots
+                    if bin(cover).count("1") != k:
+                        continue
+                    used = {n for n, _ in group}
+                    targets = [i for pos in range(size) if cover >> pos & 1
+                               for n, i in enumerate(cross[pos]) if n not in used]
+                    if self._eliminate(targets, bit):
+                        found += 1
+        return found
+
+    def x_wing(self):
+        return self._fish(2)
+
+    def swordfish(self):
+        return self._fish(3)
+
+    def run(self):
+        steps = {}
+        score = 0
+        hardest = None
+        while not self.broken and 0 in self.values:
+            for name, weight in TECHNIQUES:
+                applied = getattr(self, name)()
+                if applied:
+                    steps[name] = steps.get(name, 0) + applied
+                    score += weight * applied
+                    if hardest is None or RANK[name] > RANK[hardest]:
+                        hardest = name
+                    break
+            else:
+                break
+        solved = not self.broken and 0 not in self.values
+        size = self.size
+        board = [self.values[r * size:(r + 1) * size] for r in range(size)]
+        return Grade(solved, score, hardest, steps, board)
+
+
+def grade(board):
+    # board is a list of lists with 0 for blanks, e.g. SudokuGenerator.get_board()
+    return _Grader(board).run()
+
+
+def _grade_line(line):
+    fields = line.split()
+    result = grade(line_to_board(fields[0]))
+    return line.rstrip("\n"), result.tier, result.score, result.hardest
+
+
+def grade_lines(lines, workers=None, chunksize=64):
+    # yields (line, tier, score, hardest) in input order
+    if workers == 1:
+        for line in lines:
+            yield _grade_line(line)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(_grade_line, lines, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade puzzles by the techniques needed to solve them.")
+    parser.add_argument("input", nargs="?", default="-", help="puzzle lines (as written by batch_generate -f line)")
+    parser.add_argument("-o", "--output", default="-")
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("-t", "--tier", action="append", help="only keep puzzles of this tier (repeatable)")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    graded = kept = 0
+    try:
+        lines = (line for line in source if line.strip())
+        for line, tier, score, hardest in grade_lines(lines, args.workers):
+            graded += 1
+            if args.tier and tier not in args.tier:
+                continue
+            kept += 1
+            if args.tier:
+                out.write(line + "\n")
+            else:
+                out.write("%s %s %d %s\n" % (line, tier, score, hardest or "-"))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+    rate = graded / seconds if seconds else 0.0
+    print("graded %d, kept %d in %.2fs (%.1f puzzles/sec)" % (graded, kept, seconds, rate), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
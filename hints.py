@@ -0,0 +1,154 @@
+from array import array
+from board_model import LOCKED
+from sudoku_generator import unit_tables, iter_digits
+
+_UNITS = {}
+
+
+def units(size):
+    # (kind, number, cells) for every row, column and box
+    if size not in _UNITS:
+        box_length, box_index, peers = unit_tables(size)
+        found = [("row", r + 1, [(r, c) for c in range(size)]) for r in range(size)]
+        found += [("column", c + 1, [(r, c) for r in range(size)]) for c in range(size)]
+        boxes = [[] for _ in range(size)]
+        for r in range(size):
+            for c in range(size):
+                boxes[box_index[r][c]].append((r, c))
+        found += [("box", b + 1, cells) for b, cells in enumerate(boxes)]
+        _UNITS[size] = found
+    return _UNITS[size]
+
+
+class HintEngine:
+    # candidate state for a BoardModel, kept in step with it one move at a time. Reads the model's values
+    # instead of copying them; per unit (rows, then columns, then boxes) it keeps digit counts in one flat
+    # bytearray and a mask of the digits present. hint() is memoized per board version
+    __slots__ = ("model", "size", "box_index", "full_mask", "solution", "counts", "masks", "filled", "duplicates",
+                 "version", "_hint", "_hint_version")
+
+    def __init__(self, model, solution=None):
+        # solution, if given, is the answer as a flat bytes-like in row-major order
+        size = self.size = model.size
+        self.model = model
+        self.box_index = unit_tables(size)[1]
+        self.full_mask = (1 << size) - 1
+        self.solution = solution
+        self.counts = bytearray(3 * size * (size + 1))
+        self.masks = array("H" if size <= 16 else "I", [0]) * (3 * size)
+        self.filled = 0
+        self.duplicates = 0  # (unit, digit) pairs that appear more than once
+        self.version = 0
+        self._hint = None
+        self._hint_version = -1
+        for i, num in enumerate(model.values):
+            if num:
+                self._count(i // size, i % size, num, 1)
+
+    def _units(self, row, col):
+        size = self.size
+        return row, size + col, 2 * size + self.box_index[row][col]
+
+    def _count(self, row, col, num, step):
+        counts, masks = self.counts, self.masks
+        width = self.size + 1
+        bit = 1 << (num - 1)
+        self.filled += step
+        for unit in self._units(row, col):
+            i = unit * width + num
+            before = counts[i]
+            counts[i] = before + step
+            if before < 2 <= counts[i]:
+                self.duplicates += 1
+            elif counts[i] < 2 <= before:
+                self.duplicates -= 1
+            if counts[i]:
+                masks[unit] |= bit
+            else:
+                masks[unit] &= ~bit
+
+    def set_value(self, row, col, old, new):
+        # call after the model's value at (row, col) went from old to new
+        if old == new:
+            return
+        if old:
+            self._count(row, col, old, -1)
+        if new:
+            self._count(row, col, new, 1)
+        self.version += 1
+
+    def repeated(self, row, col, num):
+        # True when num appears more than once in a row, column or box through (row, col)
+        width = self.size + 1
+        return any(self.counts[unit * width + num] > 1 for unit in self._units(row, col))
+
+    def candidates(self, row, col):
+        size = self.size
+        if self.model.values[row * size + col]:
+            return 0
+        used = self.masks[row] | self.masks[size + col] | self.masks[2 * size + self.box_index[row][col]]
+        return self.full_mask & ~used
+
+    def candidate_list(self, row, col):
+        return list(iter_digits(self.candidates(row, col)))
+
+    def hint(self):
+        # (row, col, value, reason) for the next forced move, or None when the board is complete
+        if self._hint_version != self.version:
+            self._hint = self._find()
+            self._hint_version = self.version
+        return self._hint
+
+    def _wrong(self):
+        # first placed digit that disagrees with the solution and can still be changed, as a flat index, or None.
+        # A locked wrong digit (placed without lives) is skipped, so hints go on past it
+        solution = self.solution
+        if solution is not None:
+            flags = self.model.flags
+            for i, num in enumerate(self.model.values):
+                if num and num != solution[i] and not flags[i] & LOCKED:
+                    return i
+        return None
+
+    def _agrees(self, row, col, num):
+        # a single worked out next to a locked wrong digit can be wrong too, so check it against the solution
+        return self.solution is None or self.solution[row * self.size + col] == num
+
+    def _find(self):
+        size = self.size
+        values = self.model.values
+        wrong = self._wrong()
+        if wrong is not None:
+            row, col = divmod(wrong, size)
+            return (row, col, self.solution[wrong],
+                    "%d at row %d, column %d is wrong" % (values[wrong], row + 1, col + 1))
+        best = None
+        for r in range(size):
+            for c in range(size):
+                if values[r * size + c] == 0:
+                    mask = self.candidates(r, c)
+                    if mask and not mask & (mask - 1) and self._agrees(r, c, mask.bit_length()):
+                        return (r, c, mask.bit_length(), "only candidate left in this cell")
+                    if best is None or bin(mask).count("1") < best[0]:
+                        best = (bin(mask).count("1"), r, c)
+        if best is None:
+            return None
+        for kind, number, cells in units(size):
+            once = twice = 0
+            for r, c in cells:
+                mask = self.candidates(r, c)
+                twice |= once & mask
+                once |= mask
+            only = once & ~twice
+            while only:
+                bit = only & -only
+                only &= only - 1
+                for r, c in cells:
+                    if self.candidates(r, c) & bit and self._agrees(r, c, bit.bit_length()):
+                        return (r, c, bit.bit_length(),
+                                "only place for %d in %s %d" % (bit.bit_length(), kind, number))
+        # nothing forced by singles: point at the most constrained cell
+        count, r, c = best
+        if self.solution is not None:
+            return (r, c, self.solution[r * size + c], "no single available; fewest candidates (%d) here" % count)
+        return (r, c, 0, "no single available; fewest candidates (%d) here" % count)
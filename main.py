@@ -1,31 +1,22 @@
+import time
+START_TIME = time.perf_counter() # Startup metrics are measured from here, before the heavier imports
 import pygame
 import sys
-from sudoku_generator import SudokuGenerator
+import glyphs
+import profiler
+from sudoku_generator import SudokuGenerator, removed_for
+from board_model import CellView
+from game import Game
 
 
-class Cell:
-    def __init__(self, value, row, col, screen):
-        self.value = value
-        self.row = row
-        self.col = col
+class Cell(CellView): # Drawing view over one cell of the game's BoardModel
+    __slots__ = ("screen",)
+
+    def __init__(self, model, row, col, screen):
+        CellView.__init__(self, model, row, col) # value, sketched_value, selected, conflict and locked live in the model
         self.screen = screen
-        self.sketched_value = 0  # Default sketched value is 0
-        self.selected = False
-        self.locked = value != 0  # Cells with a non-zero value are locked and cannot be changed
-    
-    def set_cell_value(self, value): # set a value for cell
-        if not self.locked:  # Prevent changing locked values
-            self.value = value
-            self.locked = True
-            self.sketched_value = 0  # Clear the sketched value
-
-    def set_sketched_value(self, value):
-        if not self.locked:  # Only allow sketching in unlocked cells
-            self.sketched_value = value
-
-    def clear_sketched_value(self):
-        self.sketched_value = 0  # Clear the sketched value
 
+    @profiler.timed("cell.draw")
     def draw(self):
         x = self.col * 60
         y = self.row * 60
@@ -37,52 +28,105 @@ class Cell:
 
         # Draw the locked value (fixed numbers)
         if self.value != 0:
-            font = pygame.font.Font(None, 36)
-            text = font.render(str(self.value), True, (0, 0, 0))
+            text = glyphs.digit(self.value, 'conflict' if self.conflict else 'given', 60)
             text_rect = text.get_rect(center=(x + 30, y + 30))  # Center the text in the cell
             self.screen.blit(text, text_rect)
 
         # Draw the sketched value (half the size of normal number, top-left corner)
         if self.sketched_value != 0:
-            font = pygame.font.Font(None, 18)  # Smaller font size for the sketch
-            text = font.render(str(self.sketched_value), True, (128, 128, 128))  # Gray color for sketches
+            text = glyphs.digit(self.sketched_value, 'sketch', 60)  # Half-size gray glyph for sketches
             text_rect = text.get_rect(topleft=(x + 5, y + 5))  # Top-left corner
             self.screen.blit(text, text_rect)
 
 
-class Board: # Initializes boad and difficulty
-    def __init__(self, width, height, screen, difficulty):
+class Board: # Draws a Game and turns clicks into cells; the rules themselves live in game.Game
+    def __init__(self, width, height, screen, difficulty, bank=None, puzzle=None):
         self.width = width
         self.height = height
         self.screen = screen
         self.difficulty = difficulty
-        self.selected_row = None
-        self.selected_col = None
-        self.cells = self.initialize_cells()
-
-    def initialize_cells(self):
-        removed_cells = {
-            'easy': 30,
-            'medium': 40,
-            'hard': 50
-        }[self.difficulty]
-        generator = SudokuGenerator(9, removed_cells) # Makes the board with correct number of cells filled
-        generator.fill_values()
-        generator.remove_cells()
-        board = generator.get_board()
-        return [[Cell(board[row][col], row, col, self.screen) for col in range(9)] for row in range(9)]
+        self.bank = bank # Optional PuzzleBank to draw puzzles from instead of generating
+        self.show_candidates = False # Draw the remaining candidates in empty cells
+        self.initialize_cells(puzzle)
+        self.dirty = self.game.changed # Cells to repaint on the next draw_dirty()
+
+    @profiler.timed("board.initialize_cells")
+    def initialize_cells(self, puzzle=None): # Starts the Game; cells are views made on demand by cell()
+        if puzzle is not None: # Ready-made (puzzle, solution) pair, e.g. from the prefetcher
+            board, solution = puzzle
+        elif self.bank is not None and self.bank.count(self.difficulty):
+            board, solution = self.bank.random(self.difficulty)
+        else:
+            removed_cells = removed_for(9, self.difficulty)
+            generator = SudokuGenerator(9, removed_cells) # Makes the board with correct number of cells filled
+            generator.fill_values()
+            solution = [row[:] for row in generator.get_board()]
+            generator.remove_cells(unique=True) # Only blank cells that keep a single solution
+            board = generator.get_board()
+        self.game = Game(board, solution)
+        self.model = self.game.model
+
+    def cell(self, row, col): # A throwaway drawing view; all the state is in the model
+        return Cell(self.model, row, col, self.screen)
 
+    # Game state the main loop and tools read straight off the board
+    solution = property(lambda self: self.game.solution)
+    original = property(lambda self: self.game.original)
+    hints = property(lambda self: self.game.hints)
+    selected_row = property(lambda self: self.game.selected_row)
+    selected_col = property(lambda self: self.game.selected_col)
+
+    @profiler.timed("board.draw")
     def draw(self): #draws the board
+        self.dirty.clear()
         self.screen.fill((255, 255, 255))
-        for row in self.cells:
-            for cell in row:
-                cell.draw()
+        for row in range(9):
+            for col in range(9):
+                self.cell(row, col).draw()
+                self._draw_candidates(row, col)
         # Draw the grid lines
         for i in range(10):
             line_width = 3 if i % 3 == 0 else 1
             pygame.draw.line(self.screen, (0, 0, 0), (i * 60, 0), (i * 60, 540), line_width)
             pygame.draw.line(self.screen, (0, 0, 0), (0, i * 60), (540, i * 60), line_width)
 
+    def _draw_candidates(self, row, col): # Small gray digits in a 3x3 layout, only for empty unsketched cells
+        i = row * 9 + col
+        if not self.show_candidates or self.model.values[i] != 0 or self.model.sketches[i] != 0:
+            return
+        for value in self.game.candidates(row, col):
+            text = glyphs.digit(value, 'candidate', 60)
+            center = (col * 60 + 10 + ((value - 1) % 3) * 20, row * 60 + 10 + ((value - 1) // 3) * 20)
+            self.screen.blit(text, text.get_rect(center=center))
+
+    def toggle_candidates(self):
+        self.show_candidates = not self.show_candidates
+        self.game.watch_peers = self.show_candidates # Moves then repaint the peers whose candidates changed
+        self.dirty.update((row, col) for row in range(9) for col in range(9) if self.model.get(row, col) == 0)
+
+    def hint(self): # Select the next forced cell and sketch its value; returns the reason or None
+        return self.game.hint()
+
+    @profiler.timed("board.draw_dirty")
+    def draw_dirty(self): # Repaint only the changed cells and return the screen rects to update
+        rects = []
+        for row, col in self.dirty:
+            x = col * 60
+            y = row * 60
+            self.screen.fill((255, 255, 255), (x, y, 60, 60))
+            self.cell(row, col).draw()
+            self._draw_candidates(row, col)
+            # Redraw the grid lines along this cell's edges
+            for i in (row, row + 1):
+                line_width = 3 if i % 3 == 0 else 1
+                pygame.draw.line(self.screen, (0, 0, 0), (x, i * 60), (x + 60, i * 60), line_width)
+            for j in (col, col + 1):
+                line_width = 3 if j % 3 == 0 else 1
+                pygame.draw.line(self.screen, (0, 0, 0), (j * 60, y), (j * 60, y + 60), line_width)
+            rects.append(pygame.Rect(x - 2, y - 2, 64, 64))
+        self.dirty.clear()
+        return rects
+
     def click(self, x, y): # Select a cell
         if 0 <= x < 540 and 0 <= y < 540:
             row = y // 60
@@ -91,89 +135,110 @@ class Board: # Initializes boad and difficulty
         return None
 
     def select(self, row, col):
-        if self.selected_row is not None and self.selected_col is not None:
-            self.cells[self.selected_row][self.selected_col].selected = False
-        self.selected_row = row
-        self.selected_col = col
-        self.cells[row][col].selected = True
-
-    def clear(self):
-        if self.selected_row is not None and self.selected_col is not None:
-            cell = self.cells[self.selected_row][self.selected_col]
-            if not cell.locked:  # Only clear if the cell is not locked
-                cell.clear_sketched_value()
+        self.game.select(row, col)
+
+    def clear(self): # Clears the sketched value
+        self.game.clear()
 
     def sketch(self, value): # Sketch a value
-        if self.selected_row is not None and self.selected_col is not None:
-            self.cells[self.selected_row][self.selected_col].set_sketched_value(value)
+        self.game.sketch(value)
 
     def place_number(self, value):
-        if self.selected_row is not None and self.selected_col is not None:
-            self.cells[self.selected_row][self.selected_col].set_cell_value(value)
+        self.game.place(value)
+
+    def undo(self):
+        return self.game.undo()
 
-    def reset_to_original(self): # Reset te board
-        self.cells = self.initialize_cells()
-        self.selected_row = None
-        self.selected_col = None
+    def redo(self):
+        return self.game.redo()
+
+    def reset_to_original(self): # Reset te board from the snapshot, only touching edited cells
+        self.game.reset()
 
     def is_full(self): # Check if board is full
-        return all(cell.value != 0 for row in self.cells for cell in row)
-
-    def check_board(self):
-        # Check rows
-        for i in range(9):
-            nums = set()
-            for j in range(9):
-                nums.add(self.cells[i][j].value)
-            if len(nums) != 9:
-                return False
-        # Check columns
-        for j in range(9):
-            nums = set()
-            for i in range(9):
-                nums.add(self.cells[i][j].value)
-            if len(nums) != 9:
-                return False
-        # Check boxes
-        for box in range(9):
-            nums = set()
-            box_row = (box // 3) * 3
-            box_col = (box % 3) * 3
-            for i in range(3):
-                for j in range(3):
-                    nums.add(self.cells[box_row + i][box_col + j].value)
-            if len(nums) != 9:
-                return False
-        return True
-
-
-def main():
-    pygame.init()
-    pygame.font.init()
+        return self.game.is_full()
+
+    def is_won(self): # Full with no repeated digits, from the running counts
+        return self.game.is_won()
+
+    def check_board(self): # Full scan; the game loop uses the O(1) is_won() instead
+        return self.game.check()
+
+
+FPS = 60 # Frame-rate cap while the screen is changing
+RESULT_EVENT = pygame.USEREVENT + 1 # Fires once the end-of-game pause is over
+
+
+def next_events(): # Block until there is input instead of spinning while idle
+    events = pygame.event.get()
+    if not events:
+        events = [pygame.event.wait()]
+    return events
+
+
+def startup_metric(name): # Seconds since START_TIME, kept with the profiler's phases and echoed when profiling
+    seconds = time.perf_counter() - START_TIME
+    profiler.record(name, seconds)
+    if profiler.enabled:
+        print("%s: %.1f ms" % (name, seconds * 1000), file=sys.stderr)
+
+
+def main(puzzle_id=None): # puzzle_id plays a shared puzzle, e.g. "9-hard-1234" or "daily"
+    pygame.display.init() # Only the display; fonts load on first use through glyphs, audio is never started
     WINDOW_SIZE = 540
     SCREEN = pygame.display.set_mode((WINDOW_SIZE, WINDOW_SIZE + 60))
     pygame.display.set_caption("Sudoku")
+    pygame.event.set_blocked(None) # Drop everything (mouse motion, window events) except what the loop handles
+    pygame.event.set_allowed([pygame.QUIT, pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, RESULT_EVENT])
+    clock = pygame.time.Clock()
     game_state = "start"
     board = None
+    bank = None
+    prefetcher = None
+    started = False # Puzzle sources are set up once the first frame is on screen
+    first_board = False
     game_over = False
     result_message = ""
+    redraw = True # Repaint the whole screen; otherwise only dirty cells are pushed
+    show_result = False
+    buttons = []
+    result_button = pygame.Rect(WINDOW_SIZE // 2 - 60, WINDOW_SIZE // 2 + 20, 120, 40)
+    if puzzle_id is not None: # Same ID, same puzzle: straight into the game
+        import puzzle_ids
+        if puzzle_id == "daily":
+            puzzle_id = puzzle_ids.daily_id()
+        seed, size, difficulty = puzzle_ids.parse_id(puzzle_id)
+        if size != 9:
+            raise ValueError("the game plays 9x9 puzzles, %s is %dx%d" % (puzzle_id, size, size))
+        board = Board(WINDOW_SIZE, WINDOW_SIZE, SCREEN, difficulty, None, puzzle_ids.lookup(puzzle_id))
+        pygame.display.set_caption("Sudoku - " + puzzle_ids.normalize_id(puzzle_id))
+        game_state = "playing"
 
     while True: # Game loop
         if game_state == "start":
-            SCREEN.fill((255, 255, 255))
-            font = pygame.font.Font(None, 48)
-            title = font.render("Welcome to Sudoku", True, (0, 0, 0))
-            SCREEN.blit(title, (WINDOW_SIZE // 2 - title.get_width() // 2, 100))
-            difficulties = ["EASY", "MEDIUM", "HARD"]
-            buttons = []
-            for i, diff in enumerate(difficulties):
-                button = pygame.Rect(WINDOW_SIZE // 2 - 100, 250 + i * 80, 200, 50)
-                pygame.draw.rect(SCREEN, (255, 165, 0), button)
-                font = pygame.font.Font(None, 36)
-                text = font.render(diff, True, (0, 0, 0))
-                SCREEN.blit(text, (button.centerx - text.get_width() // 2, button.centery - text.get_height() // 2))
-                buttons.append((button, diff.lower()))
-            for event in pygame.event.get():
+            if redraw:
+                SCREEN.fill((255, 255, 255))
+                title = glyphs.text("Welcome to Sudoku", 48)
+                SCREEN.blit(title, (WINDOW_SIZE // 2 - title.get_width() // 2, 100))
+                difficulties = ["EASY", "MEDIUM", "HARD"]
+                buttons = []
+                for i, diff in enumerate(difficulties):
+                    button = pygame.Rect(WINDOW_SIZE // 2 - 100, 250 + i * 80, 200, 50)
+                    pygame.draw.rect(SCREEN, (255, 165, 0), button)
+                    text = glyphs.text(diff)
+                    SCREEN.blit(text, (button.centerx - text.get_width() // 2, button.centery - text.get_height() // 2))
+                    buttons.append((button, diff.lower()))
+                pygame.display.flip()
+                redraw = False
+                if not started:
+                    startup_metric("startup.first_frame")
+                    from puzzle_bank import open_bank
+                    from prefetch import PuzzlePrefetcher
+                    bank = open_bank() # Pre-built puzzles, if a bank file is present
+                    if bank is None: # Without a bank, generate puzzles in the background while the start screen is up
+                        prefetcher = PuzzlePrefetcher(["easy", "medium", "hard"]).start()
+                    started = True
+            for event in next_events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
@@ -181,22 +246,41 @@ def main():
                     mouse_pos = event.pos
                     for button, difficulty in buttons:
                         if button.collidepoint(mouse_pos):
-                            board = Board(WINDOW_SIZE, WINDOW_SIZE, SCREEN, difficulty)
+                            puzzle = prefetcher.get(difficulty) if prefetcher else None
+                            board = Board(WINDOW_SIZE, WINDOW_SIZE, SCREEN, difficulty, bank, puzzle)
                             game_state = "playing"
+                            redraw = True
         elif game_state == "playing":
-            board.draw()
-            # Draw buttons
-            buttons = []
-            labels = ["Reset", "Restart", "Exit"]
-            for i, label in enumerate(labels):
-                button = pygame.Rect(20 + i * 180, WINDOW_SIZE + 10, 160, 40)
-                pygame.draw.rect(SCREEN, (255, 165, 0), button)
-                font = pygame.font.Font(None, 36)
-                text = font.render(label, True, (0, 0, 0))
-                SCREEN.blit(text, (button.centerx - text.get_width() // 2, button.centery - text.get_height() // 2))
-                buttons.append((button, label.lower()))
-
-            for event in pygame.event.get():
+            frame_start = profiler.now() # "frame" is draw + flip only; time blocked in next_events() isn't work
+            if redraw:
+                board.draw()
+                # Draw buttons
+                buttons = []
+                labels = ["Reset", "Restart", "Exit"]
+                for i, label in enumerate(labels):
+                    button = pygame.Rect(20 + i * 180, WINDOW_SIZE + 10, 160, 40)
+                    pygame.draw.rect(SCREEN, (255, 165, 0), button)
+                    text = glyphs.text(label)
+                    SCREEN.blit(text, (button.centerx - text.get_width() // 2, button.centery - text.get_height() // 2))
+                    buttons.append((button, label.lower()))
+                with profiler.span("display"):
+                    pygame.display.flip()
+                redraw = False
+                if not first_board:
+                    startup_metric("startup.first_board")
+                    first_board = True
+            else:
+                rects = board.draw_dirty()
+                if rects:
+                    with profiler.span("display"):
+                        pygame.display.update(rects)
+            profiler.since("frame", frame_start)
+            if profiler.enabled:
+                pygame.display.update(profiler.draw_overlay(SCREEN))
+
+            events = next_events()
+            events_start = profiler.now()
+            for event in events:
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
@@ -214,6 +298,7 @@ def main():
                                 result_message = ""
                             elif action == "restart":
                                 game_state = "start"
+                                redraw = True
                             elif action == "exit":
                                 pygame.quit()
                                 sys.exit()
@@ -225,52 +310,73 @@ def main():
                     elif event.key == pygame.K_RETURN:
                         # Confirm the sketched value as a locked value
                         if board.selected_row is not None and board.selected_col is not None:
-                            cell = board.cells[board.selected_row][board.selected_col]
+                            cell = board.cell(board.selected_row, board.selected_col)
                             if cell.sketched_value != 0:
-                                cell.set_cell_value(cell.sketched_value)
+                                board.place_number(cell.sketched_value)
                     elif event.key == pygame.K_DELETE or event.key == pygame.K_BACKSPACE:
-                        board.clear()
-                        # Also clear the sketched value
-                        if board.selected_row is not None and board.selected_col is not None:
-                            cell = board.cells[board.selected_row][board.selected_col]
-                            cell.clear_sketched_value()
-                if board.is_full():
-                    if board.check_board():
+                        board.clear() # Clears the sketched value
+                    elif event.key == pygame.K_z and event.mod & pygame.KMOD_CTRL:
+                        board.undo()
+                    elif event.key == pygame.K_y and event.mod & pygame.KMOD_CTRL:
+                        board.redo()
+                    elif event.key == pygame.K_h: # Hint: select the next forced cell and sketch it
+                        reason = board.hint()
+                        pygame.display.set_caption("Sudoku - hint: " + reason if reason else "Sudoku")
+                    elif event.key == pygame.K_c: # Show/hide candidates
+                        board.toggle_candidates()
+                    elif event.key == pygame.K_F3: # Profiling overlay on/off
+                        profiler.toggle()
+                        redraw = True
+                    elif event.key == pygame.K_F4: # Dump per-phase histograms
+                        profiler.export_csv()
+                if game_state == "playing" and board.is_full():
+                    if board.is_won():
                         game_state = "won"
                     else:
                         game_state = "lost"
+                    # Leave the finished board up for a second, without blocking the event loop
+                    show_result = False
+                    pygame.time.set_timer(RESULT_EVENT, 1000, 1)
+            profiler.since("events", events_start)
 
         elif game_state in ["won", "lost"]:
-            pygame.time.delay(1000)
-            overlay = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE + 60))
-            overlay.fill((255, 255, 255))
-            overlay.set_alpha(230)
-            SCREEN.blit(overlay, (0, 0))
-            font = pygame.font.Font(None, 48)
-            if game_state == "won":
-                text = font.render("Game Won!", True, (0, 0, 0))
-            else:
-                text = font.render("Game Over :(", True, (0, 0, 0))
-            SCREEN.blit(text, (WINDOW_SIZE // 2 - text.get_width() // 2, WINDOW_SIZE // 2 - 50))
-            button = pygame.Rect(WINDOW_SIZE // 2 - 60, WINDOW_SIZE // 2 + 20, 120, 40)
-            pygame.draw.rect(SCREEN, (255, 165, 0), button)
-            font = pygame.font.Font(None, 36)
-            text = font.render("RESTART" if game_state == "lost" else "EXIT", True, (0, 0, 0))
-            SCREEN.blit(text, (button.centerx - text.get_width() // 2, button.centery - text.get_height() // 2))
-            for event in pygame.event.get():
+            rects = board.draw_dirty() # The final move
+            if rects:
+                pygame.display.update(rects)
+            if redraw:
+                overlay = pygame.Surface((WINDOW_SIZE, WINDOW_SIZE + 60))
+                overlay.fill((255, 255, 255))
+                overlay.set_alpha(230)
+                SCREEN.blit(overlay, (0, 0))
+                if game_state == "won":
+                    text = glyphs.text("Game Won!", 48)
+                else:
+                    text = glyphs.text("Game Over :(", 48)
+                SCREEN.blit(text, (WINDOW_SIZE // 2 - text.get_width() // 2, WINDOW_SIZE // 2 - 50))
+                pygame.draw.rect(SCREEN, (255, 165, 0), result_button)
+                text = glyphs.text("RESTART" if game_state == "lost" else "EXIT")
+                SCREEN.blit(text, (result_button.centerx - text.get_width() // 2,
+                                   result_button.centery - text.get_height() // 2))
+                pygame.display.flip()
+                redraw = False
+            for event in next_events():
                 if event.type == pygame.QUIT:
                     pygame.quit()
                     sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if button.collidepoint(event.pos):
+                if event.type == RESULT_EVENT:
+                    show_result = True
+                    redraw = True
+                if event.type == pygame.MOUSEBUTTONDOWN and show_result:
+                    if result_button.collidepoint(event.pos):
                         if game_state == "won":
                             pygame.quit()
                             sys.exit()
                         else:
                             game_state = "start"
+                            redraw = True
 
-        pygame.display.flip()
+        clock.tick(FPS)
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
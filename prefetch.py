@@ -0,0 +1,51 @@
+import queue
+import threading
+from batch_generate import make_puzzle
+
+
+class PuzzlePrefetcher:
+    # keeps up to depth ready (puzzle, solution) pairs per difficulty, generated on a background thread
+    def __init__(self, difficulties, depth=2, size=9, unique=True):
+        self.size = size
+        self.unique = unique
+        self.queues = {difficulty: queue.Queue(maxsize=depth) for difficulty in difficulties}
+        self.wake = threading.Event()
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if not self.running:
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name="puzzle-prefetch", daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        self.wake.set()
+
+    def _generate(self, difficulty):
+        return make_puzzle(self.size, difficulty, self.unique)
+
+    def _run(self):
+        while self.running:
+            # top up the emptiest queue first so one difficulty cannot starve the others
+            pending = [q for q in self.queues.items() if not q[1].full()]
+            if not pending:
+                self.wake.wait()
+                self.wake.clear()
+                continue
+            difficulty, ready = min(pending, key=lambda item: item[1].qsize())
+            ready.put(self._generate(difficulty))
+
+    def get(self, difficulty):
+        try:
+            puzzle = self.queues[difficulty].get_nowait()
+        except queue.Empty:
+            # only reached if games are started faster than the thread refills
+            puzzle = self._generate(difficulty)
+        self.wake.set()
+        return puzzle
+
+    def ready(self, difficulty):
+        return self.queues[difficulty].qsize()
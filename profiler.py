@@ -0,0 +1,148 @@
+import atexit
+import csv
+import functools
+import os
+import time
+from collections import deque
+
+# Off unless SUDOKU_PROFILE is set (or toggled at runtime); disabled spans and timers do no timing at all.
+enabled = os.environ.get("SUDOKU_PROFILE", "") not in ("", "0")
+CSV_PATH = os.environ.get("SUDOKU_PROFILE_CSV", "profile.csv")
+WINDOW = 600  # samples kept per phase
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133)
+
+_samples = {}
+
+
+def set_enabled(on):
+    global enabled
+    enabled = bool(on)
+
+
+def toggle():
+    set_enabled(not enabled)
+    return enabled
+
+
+def record(name, seconds):
+    samples = _samples.get(name)
+    if samples is None:
+        samples = _samples[name] = deque(maxlen=WINDOW)
+    samples.append(seconds)
+
+
+def now():
+    # start stamp for since(); 0 when disabled so the pair costs two cheap calls
+    return time.perf_counter() if enabled else 0
+
+
+def since(name, start):
+    if enabled and start:
+        record(name, time.perf_counter() - start)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.start)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL = _NullSpan()
+
+
+def span(name):
+    return _Span(name) if enabled else _NULL
+
+
+def timed(name):
+    # decorator version of span() for whole functions
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if not enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return inner
+    return wrap
+
+
+def stats(name):
+    # (count, p50, p95, max) in milliseconds over the rolling window
+    samples = sorted(_samples.get(name, ()))
+    if not samples:
+        return 0, 0.0, 0.0, 0.0
+    n = len(samples)
+    return n, samples[n // 2] * 1000, samples[min(n - 1, int(n * 0.95))] * 1000, samples[-1] * 1000
+
+
+def histogram(name):
+    counts = [0] * (len(BUCKETS_MS) + 1)
+    for seconds in _samples.get(name, ()):
+        ms = seconds * 1000
+        i = 0
+        while i < len(BUCKETS_MS) and ms > BUCKETS_MS[i]:
+            i += 1
+        counts[i] += 1
+    return counts
+
+
+def export_csv(path=None):
+    path = path or CSV_PATH
+    header = ["phase", "count", "p50_ms", "p95_ms", "max_ms"]
+    header += ["le_%gms" % edge for edge in BUCKETS_MS] + ["gt_%gms" % BUCKETS_MS[-1]]
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for name in sorted(_samples):
+            count, p50, p95, worst = stats(name)
+            writer.writerow([name, count, "%.3f" % p50, "%.3f" % p95, "%.3f" % worst] + histogram(name))
+    return path
+
+
+def draw_overlay(screen, phases=5):
+    # frame time (draw + flip, see main.py), the FPS it allows and the slowest phases in the top-left corner;
+    # returns the rect to update
+    import pygame
+    import glyphs
+    font = glyphs.font(None, 20)
+    count, p50, p95, worst = stats("frame")
+    lines = ["frame %.1f ms  p95 %.1f  FPS %.0f" % (p50, p95, 1000 / p50 if p50 else 0)]
+    ranked = sorted((stats(name)[2], name) for name in _samples if name != "frame")
+    for p95, name in reversed(ranked[-phases:]):
+        lines.append("%-18s p95 %.2f ms" % (name, p95))
+    rect = pygame.Rect(0, 0, 230, 16 * len(lines) + 6)
+    backdrop = pygame.Surface(rect.size)
+    backdrop.set_alpha(200)
+    backdrop.fill((0, 0, 0))
+    screen.blit(backdrop, rect)
+    for i, line in enumerate(lines):
+        screen.blit(font.render(line, True, (0, 255, 0)), (4, 3 + 16 * i))
+    return rect
+
+
+@atexit.register
+def _export_on_exit():
+    if _samples and os.environ.get("SUDOKU_PROFILE_CSV"):
+        export_csv()
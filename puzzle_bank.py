@@ -0,0 +1,163 @@
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+from sudoku_generator import DIFFICULTY_REMOVED, line_to_board
+
+# Layout: header, one tier entry per difficulty, then fixed-size records grouped by difficulty.
+# A record is the givens followed by the solution, each packed two cells per byte.
+MAGIC = b"SDKB"
+VERSION = 1
+HEADER = struct.Struct("<4sBBH")
+NAME_BYTES = 8
+TIER = struct.Struct("<%dsQQ" % NAME_BYTES)  # difficulty name, first record, record count
+DEFAULT_PATH = os.environ.get("SUDOKU_BANK", "puzzles.bank")
+
+_NIBBLES = [(b >> 4, b & 15) for b in range(256)]
+
+
+def record_size(size):
+    return 2 * ((size * size + 1) // 2)
+
+
+def pack_board(board):
+    values = [v for row in board for v in row]
+    if len(values) % 2:
+        values.append(0)
+    return bytes((values[i] << 4) | values[i + 1] for i in range(0, len(values), 2))
+
+
+def unpack_board(data, size):
+    values = []
+    for byte in data:
+        values.extend(_NIBBLES[byte])
+    return [values[r * size:(r + 1) * size] for r in range(size)]
+
+
+def _check_shape(board, size, name, count):
+    if len(board) != size or any(len(row) != size for row in board):
+        raise ValueError("%s puzzle %d is not %dx%d" % (name, count, size, size))
+
+
+def write_bank(path, tiers, size=9):
+    # tiers maps difficulty -> iterable of (puzzle, solution); each iterable is streamed straight to disk.
+    # ValueError for names over NAME_BYTES or boards that aren't size x size; a failed write leaves no file
+    if size > 15:
+        raise ValueError("a 4-bit bank holds grids up to 15x15, got %d" % size)
+    names = list(tiers)
+    for name in names:
+        if len(name.encode()) > NAME_BYTES:
+            raise ValueError("tier name %r is longer than %d bytes" % (name, NAME_BYTES))
+    data_start = HEADER.size + TIER.size * len(names)
+    entries = []
+    try:
+        with open(path, "wb") as f:
+            f.write(b"\0" * data_start)
+            first = 0
+            for name in names:
+                count = 0
+                for puzzle, solution in tiers[name]:
+                    _check_shape(puzzle, size, name, count)
+                    _check_shape(solution, size, name, count)
+                    f.write(pack_board(puzzle) + pack_board(solution))
+                    count += 1
+                entries.append((name, first, count))
+                first += count
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, size, len(names)))
+            for name, first, count in entries:
+                f.write(TIER.pack(name.encode(), first, count))
+    except Exception:
+        os.remove(path)
+        raise
+
+
+class PuzzleBank:
+    def __init__(self, path=DEFAULT_PATH):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.size, n_tiers = HEADER.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d puzzle bank" % (path, VERSION))
+        self.tiers = {}
+        for i in range(n_tiers):
+            name, first, count = TIER.unpack_from(self.data, HEADER.size + i * TIER.size)
+            self.tiers[name.rstrip(b"\0").decode()] = (first, count)
+        self.data_start = HEADER.size + TIER.size * n_tiers
+        self.record_size = record_size(self.size)
+
+    def count(self, difficulty):
+        return self.tiers.get(difficulty, (0, 0))[1]
+
+    def get(self, difficulty, index):
+        # O(1): seek straight to the record, only its bytes are paged in
+        first, count = self.tiers[difficulty]
+        if not 0 <= index < count:
+            raise IndexError("%s has %d puzzles, asked for %d" % (difficulty, count, index))
+        offset = self.data_start + (first + index) * self.record_size
+        half = self.record_size // 2
+        puzzle = unpack_board(self.data[offset:offset + half], self.size)
+        solution = unpack_board(self.data[offset + half:offset + self.record_size], self.size)
+        return puzzle, solution
+
+    def random(self, difficulty):
+        return self.get(difficulty, random.randrange(self.count(difficulty)))
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_bank(path=DEFAULT_PATH):
+    # the game falls back to live generation when there is no bank on disk
+    if not os.path.exists(path):
+        return None
+    return PuzzleBank(path)
+
+
+def _parse_lines(lines):
+    for line in lines:
+        puzzle, solution = line.split()
+        yield line_to_board(puzzle), line_to_board(solution)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect a packed puzzle bank.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="generate puzzles into a new bank")
+    build.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    build.add_argument("-n", "--count", type=int, default=1000, help="puzzles per difficulty")
+    build.add_argument("-w", "--workers", type=int, default=None)
+    build.add_argument("--unique", action="store_true")
+    build.add_argument("--dedup", metavar="INDEX", help="skip puzzles equivalent to any already in this index")
+    info = sub.add_parser("info", help="show the puzzles held per difficulty")
+    info.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        from batch_generate import iter_batch
+        from canonical import DedupIndex
+        index = DedupIndex(args.dedup) if args.dedup else None
+        tiers = {name: _parse_lines(iter_batch(args.count, 9, name, args.workers, args.unique, "line",
+                                               index=index))
+                 for name in DIFFICULTY_REMOVED}
+        try:
+            write_bank(args.path, tiers)
+        finally:
+            if index is not None:
+                index.close()
+    with PuzzleBank(args.path) as bank:
+        for name, (first, count) in bank.tiers.items():
+            print("%s: %d puzzles" % (name, count), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
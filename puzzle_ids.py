@@ -0,0 +1,115 @@
+import argparse
+import datetime
+from collections import OrderedDict
+from batch_generate import make_puzzle
+from sudoku_generator import DIFFICULTY_REMOVED, SIZES, board_to_line
+
+# A puzzle ID is "<size>-<difficulty>-<seed>", e.g. "9-hard-20261018". The same ID always regenerates the
+# same unique puzzle, so shared and daily puzzles need no storage; the LRU cache keeps the popular ones in memory.
+CACHE_SIZE = 256
+
+
+def make_id(seed, size=9, difficulty="medium"):
+    return "%d-%s-%d" % (size, difficulty, seed)
+
+
+def parse_id(puzzle_id):
+    # returns (seed, size, difficulty); ValueError for anything that isn't a well-formed ID
+    try:
+        size, difficulty, seed = puzzle_id.strip().split("-")
+        size, seed = int(size), int(seed)
+    except ValueError:
+        raise ValueError("puzzle ID should look like 9-medium-1234, got %r" % puzzle_id)
+    difficulty = difficulty.lower()
+    if difficulty not in DIFFICULTY_REMOVED:
+        raise ValueError("unknown difficulty %r in puzzle ID" % difficulty)
+    if size not in SIZES:
+        raise ValueError("puzzle size must be one of %s, got %d" % (", ".join(map(str, SIZES)), size))
+    return seed, size, difficulty
+
+
+def normalize_id(puzzle_id):
+    # "9-hard-007", "9-HARD-7" and "9-hard-7" are the same puzzle
+    return make_id(*parse_id(puzzle_id))
+
+
+def daily_id(size=9, difficulty="medium", day=None):
+    # everyone gets the same puzzle on the same date
+    day = day or datetime.date.today()
+    return make_id(int(day.strftime("%Y%m%d")), size, difficulty)
+
+
+def puzzle_for(puzzle_id):
+    # (puzzle, solution) for an ID, generated from scratch
+    seed, size, difficulty = parse_id(puzzle_id)
+    return make_puzzle(size, difficulty, True, seed)
+
+
+class PuzzleCache:
+    # least recently used IDs are dropped once more than maxsize are held
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, puzzle_id):
+        # the cached (puzzle, solution) or None, counted as a hit or a miss. Fresh lists every time,
+        # so a caller editing its board can't change the cached copy
+        key = normalize_id(puzzle_id)
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        puzzle, solution = entry
+        return [list(row) for row in puzzle], [list(row) for row in solution]
+
+    def get(self, puzzle_id):
+        # cached, or generated and cached
+        found = self.lookup(puzzle_id)
+        if found is None:
+            found = puzzle_for(puzzle_id)
+            self.put(puzzle_id, *found)
+        return found
+
+    def put(self, puzzle_id, puzzle, solution):
+        key = normalize_id(puzzle_id)
+        self.entries[key] = (tuple(map(tuple, puzzle)), tuple(map(tuple, solution)))
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self.entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0}
+
+    def __len__(self):
+        return len(self.entries)
+
+
+_cache = PuzzleCache()
+
+
+def lookup(puzzle_id):
+    # shared process-wide cache
+    return _cache.get(puzzle_id)
+
+
+def cache_stats():
+    return _cache.stats()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Print the puzzle behind an ID.")
+    parser.add_argument("ids", nargs="*", help="puzzle IDs such as 9-hard-1234 (default: today's puzzle)")
+    args = parser.parse_args(argv)
+    for puzzle_id in args.ids or [daily_id()]:
+        puzzle, solution = lookup(puzzle_id)
+        print(puzzle_id, board_to_line(puzzle), board_to_line(solution))
+
+
+if __name__ == "__main__":
+    main()
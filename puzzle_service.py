@@ -0,0 +1,335 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlsplit, parse_qs
+
+import profiler
+from batch_generate import make_puzzle
+from grader import grade
+from puzzle_ids import PuzzleCache, daily_id, normalize_id, puzzle_for
+from solver import ENGINES
+from sudoku_generator import SudokuGenerator, DIFFICULTY_REMOVED, SIZES, check_board
+
+# Local HTTP/JSON front end for the generator, solver, validator and grader.
+# CPU work runs in a process pool; the event loop only parses requests and keeps the warm pools full.
+MAX_BATCH = 1000
+MAX_GENERATE = {16: 64}  # lower /generate caps by size: a 16x16 hard unique puzzle takes seconds
+MAX_BACKOFF = 30.0  # seconds between refill retries while the pool keeps failing
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 413: "Payload Too Large",
+           500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+class ServiceError(Exception):
+    def __init__(self, status, message):
+        Exception.__init__(self, message)
+        self.status = status
+
+
+# --- worker side: plain functions so the process pool can pickle them ---
+
+def generate_many(size, difficulty, unique, count):
+    return [make_puzzle(size, difficulty, unique) for _ in range(count)]
+
+
+def solve_one(board, engine="bitmask"):
+    try:
+        solver = ENGINES[engine](board)
+    except ValueError as e:
+        return {"solved": False, "reason": str(e)}
+    if not solver.ok:
+        return {"solved": False, "reason": "givens conflict"}
+    solutions = solver.solutions(2)
+    if not solutions:
+        return {"solved": False, "reason": "no solution"}
+    return {"solved": True, "unique": len(solutions) == 1, "solution": solutions[0]}
+
+
+def solve_many(boards, engine="bitmask"):
+    return [solve_one(board, engine) for board in boards]
+
+
+def validate_many(boards):
+    results = []
+    for board in boards:
+        generator = SudokuGenerator(len(board), 0)
+        consistent = generator.load(board)
+        complete = all(all(row) for row in board)
+        results.append({"consistent": consistent, "complete": complete,
+                        "solved": complete and check_board(board)})
+    return results
+
+
+def grade_many(boards):
+    results = []
+    for board in boards:
+        result = grade(board)
+        results.append({"tier": result.tier, "score": result.score, "hardest": result.hardest,
+                        "steps": result.steps})
+    return results
+
+
+# --- event loop side ---
+
+class PuzzleService:
+    def __init__(self, workers=None, warm=16, max_pending=64, size=9, unique=True, cache_size=256):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers)
+        self.cache = PuzzleCache(cache_size)  # ID -> puzzle, kept on the event loop side
+        self.size = size
+        self.unique = unique
+        self.warm = {difficulty: asyncio.Queue(maxsize=warm) for difficulty in DIFFICULTY_REMOVED}
+        self.max_pending = max_pending
+        self.pending = 0
+        self.started = time.time()
+        self.requests = {}
+        self.rejected = 0
+        self.refill_tasks = []
+        self.refill_health = {d: {"failures": 0, "last_error": None} for d in DIFFICULTY_REMOVED}
+
+    async def run_cpu(self, fn, *args):
+        return (await self.run_cpu_jobs(fn, [args]))[0]
+
+    async def run_cpu_jobs(self, fn, jobs):
+        # fn(*args) for each args in jobs, spread over the pool. Every job counts against max_pending until it
+        # finishes, and a request whose jobs don't all fit is refused instead of queueing without bound
+        if self.pending + len(jobs) > self.max_pending:
+            self.rejected += 1
+            raise ServiceError(503, "busy, retry later")
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        futures = []
+        try:
+            for args in jobs:
+                future = loop.run_in_executor(pool, fn, *args)
+                self.pending += 1
+                future.add_done_callback(self._job_done)
+                futures.append(future)
+            return await asyncio.gather(*futures)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            raise ServiceError(503, "worker pool restarted, retry later")
+        finally:
+            for future in futures: # Drop whatever hasn't started if the request failed or went away
+                future.cancel()
+
+    def _job_done(self, future):
+        self.pending -= 1
+
+    def _replace_pool(self, broken):
+        # a worker that dies takes the whole pool with it; every later submit fails until it's rebuilt
+        if self.pool is broken:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = ProcessPoolExecutor(self.workers)
+
+    async def _refill(self, difficulty, chunk=4):
+        # runs for the life of the service: failures are logged and retried with backoff, never fatal
+        ready = self.warm[difficulty]
+        health = self.refill_health[difficulty]
+        loop = asyncio.get_running_loop()
+        backoff = 0.5
+        while True:
+            room = ready.maxsize - ready.qsize()
+            if room <= 0:
+                await asyncio.sleep(0.05)
+                continue
+            pool = self.pool
+            try:
+                puzzles = await loop.run_in_executor(pool, generate_many, self.size, difficulty,
+                                                     self.unique, min(chunk, room))
+            except Exception as e:
+                health["failures"] += 1
+                health["last_error"] = "%s: %s" % (e.__class__.__name__, e)
+                print("refill %s failed (%s), retrying in %.1fs" % (difficulty, health["last_error"], backoff),
+                      file=sys.stderr)
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_pool(pool)
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                continue
+            backoff = 0.5
+            for puzzle in puzzles:
+                await ready.put(puzzle)
+
+    def start(self):
+        self.refill_tasks = [asyncio.ensure_future(self._refill(d)) for d in self.warm]
+
+    def close(self):
+        for task in self.refill_tasks:
+            task.cancel()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def generate(self, params, body):
+        difficulty = params.get("difficulty", "medium")
+        if difficulty not in DIFFICULTY_REMOVED:
+            raise ServiceError(400, "difficulty must be one of %s" % ", ".join(DIFFICULTY_REMOVED))
+        size = int(params.get("size", self.size))
+        if size not in SIZES:
+            raise ServiceError(400, "size must be one of %s" % ", ".join(map(str, SIZES)))
+        count = int(params.get("count", 1))
+        limit = MAX_GENERATE.get(size, MAX_BATCH)
+        if not 1 <= count <= limit:
+            raise ServiceError(413, "count must be 1..%d for %dx%d" % (limit, size, size))
+        unique = params.get("unique", "1" if self.unique else "0") not in ("0", "false")
+        puzzles = []
+        if size == self.size and unique == self.unique:
+            ready = self.warm[difficulty]
+            while len(puzzles) < count and not ready.empty():
+                puzzles.append(ready.get_nowait())
+        if len(puzzles) < count:
+            # one job per worker at most, so a big batch uses the whole pool and counts as that many jobs
+            left = count - len(puzzles)
+            jobs = min(left, self.workers or os.cpu_count() or 1, self.max_pending)
+            sizes = [left // jobs + (i < left % jobs) for i in range(jobs)]
+            for chunk in await self.run_cpu_jobs(generate_many, [(size, difficulty, unique, n) for n in sizes]):
+                puzzles += chunk
+        return {"puzzles": [{"puzzle": p, "solution": s} for p, s in puzzles]}
+
+    async def puzzle(self, params, body):
+        # /puzzle?id=9-hard-1234: the same ID always returns the same puzzle
+        if "id" not in params:
+            raise ServiceError(400, "expected ?id=<size>-<difficulty>-<seed>")
+        puzzle_id = normalize_id(params["id"])
+        found = self.cache.lookup(puzzle_id)
+        if found is None:
+            found = await self.run_cpu(puzzle_for, puzzle_id)
+            self.cache.put(puzzle_id, *found)
+        return {"id": puzzle_id, "puzzle": found[0], "solution": found[1]}
+
+    async def daily(self, params, body):
+        puzzle_id = daily_id(int(params.get("size", self.size)), params.get("difficulty", "medium"))
+        return await self.puzzle({"id": puzzle_id}, body)
+
+    async def _batched(self, fn, body, *args):
+        # accepts {"board": ...} or {"boards": [...]}; a batch is one pool task
+        if "boards" in body:
+            boards = body["boards"]
+            if len(boards) > MAX_BATCH:
+                raise ServiceError(413, "at most %d boards per request" % MAX_BATCH)
+            return {"results": await self.run_cpu(fn, boards, *args)}
+        if "board" in body:
+            return (await self.run_cpu(fn, [body["board"]], *args))[0]
+        raise ServiceError(400, "expected 'board' or 'boards'")
+
+    async def solve(self, params, body):
+        engine = params.get("engine", "bitmask")
+        if engine not in ENGINES:
+            raise ServiceError(400, "engine must be one of %s" % ", ".join(sorted(ENGINES)))
+        return await self._batched(solve_many, body, engine)
+
+    async def validate(self, params, body):
+        return await self._batched(validate_many, body)
+
+    async def grade(self, params, body):
+        return await self._batched(grade_many, body)
+
+    async def stats(self, params, body):
+        elapsed = time.time() - self.started
+        endpoints = {}
+        for name, count in self.requests.items():
+            window, p50, p95, worst = profiler.stats("service." + name)
+            endpoints[name] = {"requests": count, "per_sec": count / elapsed if elapsed else 0.0,
+                               "p50_ms": p50, "p95_ms": p95, "max_ms": worst}
+        return {"uptime_s": elapsed, "pending": self.pending, "rejected": self.rejected,
+                "warm": {d: q.qsize() for d, q in self.warm.items()}, "cache": self.cache.stats(),
+                "refill": {d: dict(self.refill_health[d], running=not task.done())
+                           for d, task in zip(self.warm, self.refill_tasks)},
+                "endpoints": endpoints}
+
+    async def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        name = url.path.strip("/")
+        handler = {"generate": self.generate, "solve": self.solve, "validate": self.validate,
+                   "grade": self.grade, "puzzle": self.puzzle, "daily": self.daily,
+                   "stats": self.stats}.get(name)
+        if handler is None:
+            raise ServiceError(404, "no endpoint /%s" % name)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            raise ServiceError(400, "body is not JSON")
+        start = time.perf_counter()
+        result = await handler(params, payload)
+        profiler.record("service." + name, time.perf_counter() - start)
+        self.requests[name] = self.requests.get(name, 0) + 1
+        return result
+
+    async def handle(self, reader, writer):
+        # minimal HTTP/1.1 with keep-alive: request line, headers, Content-Length body
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                try:
+                    status, result = 200, await self.dispatch(method, target, body)
+                except ServiceError as e:
+                    status, result = e.status, {"error": str(e)}
+                except (ValueError, TypeError, KeyError, IndexError) as e:
+                    status, result = 400, {"error": "bad request: %s" % e}
+                except Exception as e:
+                    traceback.print_exc()
+                    status, result = 500, {"error": "internal error: %s" % e.__class__.__name__}
+                data = json.dumps(result, separators=(",", ":")).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                head = "HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n" % (
+                    status, REASONS.get(status, ""), len(data))
+                if status == 503:
+                    head += "Retry-After: 1\r\n"
+                head += "Connection: %s\r\n\r\n" % ("keep-alive" if keep_alive else "close")
+                writer.write(head.encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(host="127.0.0.1", port=8080, **options):
+    service = PuzzleService(**options)
+    service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print("puzzle service on http://%s:%d" % (host, port))
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve puzzles over local HTTP/JSON.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("-p", "--port", type=int, default=8080)
+    parser.add_argument("-w", "--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--warm", type=int, default=16, help="ready puzzles kept per difficulty")
+    parser.add_argument("--max-pending", type=int, default=64, help="CPU jobs in flight before answering 503")
+    parser.add_argument("--no-unique", action="store_true", help="skip uniqueness checks for warm puzzles")
+    parser.add_argument("--cache-size", type=int, default=256, help="puzzle IDs kept in memory")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, workers=args.workers, warm=args.warm,
+                          max_pending=args.max_pending, unique=not args.no_unique, cache_size=args.cache_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+import argparse
+import multiprocessing
+import sys
+import time
+from sudoku_generator import unit_tables, iter_digits, line_to_board, board_to_line
+
+# Standalone solving for any board (0 for blanks): solve() and count_solutions() with a choice of engine.
+# Engines take the board in __init__ (ValueError for givens outside 0..size) and return up to limit
+# solutions from solutions(limit).
+
+
+def check_givens(board):
+    # ValueError unless board is size x size with every cell an int in 0..size
+    size = len(board)
+    for r, row in enumerate(board):
+        if len(row) != size:
+            raise ValueError("row %d has %d cells, expected %d" % (r, len(row), size))
+        for c, num in enumerate(row):
+            if not isinstance(num, int) or isinstance(num, bool) or not 0 <= num <= size:
+                raise ValueError("cell (%d, %d) holds %r, expected 0..%d" % (r, c, num, size))
+
+
+class BitmaskEngine:
+    # backtracking over row/column/box bitmasks, branching on the digit with the fewest places left in some
+    # unit, or on the most-constrained cell when that has fewer candidates; forced cells (naked singles, then
+    # hidden singles) are filled in a loop at each node instead of branching, which is where most of the
+    # propagation happens
+    def __init__(self, board):
+        check_givens(board)
+        size = self.size = len(board)
+        self.box_length, box_index, peers = unit_tables(size)
+        self.box_of = [box_index[i // size][i % size] for i in range(size * size)]
+        self.full_mask = (1 << size) - 1
+        self.values = [v for row in board for v in row]
+        self.rows = [0] * size
+        self.cols = [0] * size
+        self.boxes = [0] * size
+        self.ok = True
+        for i, num in enumerate(self.values):
+            if num:
+                bit = 1 << (num - 1)
+                r, c, b = i // size, i % size, self.box_of[i]
+                if (self.rows[r] | self.cols[c] | self.boxes[b]) & bit:
+                    self.ok = False
+                self._mark(i, bit)
+        self.empty = [i for i, num in enumerate(self.values) if not num]
+        self.units = [range(r * size, (r + 1) * size) for r in range(size)]
+        self.units += [range(c, size * size, size) for c in range(size)]
+        self.units += [[i for i in range(size * size) if self.box_of[i] == b] for b in range(size)]
+
+    def _mark(self, i, bit):
+        self.rows[i // self.size] |= bit
+        self.cols[i % self.size] |= bit
+        self.boxes[self.box_of[i]] |= bit
+
+    def _place(self, i, bit):
+        self.values[i] = bit.bit_length()
+        self._mark(i, bit)
+
+    def _unplace(self, i):
+        bit = ~(1 << (self.values[i] - 1))
+        self.values[i] = 0
+        self.rows[i // self.size] &= bit
+        self.cols[i % self.size] &= bit
+        self.boxes[self.box_of[i]] &= bit
+
+    def _search(self, limit, found):
+        size, values, rows, cols, boxes, box_of = self.size, self.values, self.rows, self.cols, self.boxes, self.box_of
+        trail = []
+        while True:
+            best = -1
+            best_mask = 0
+            best_count = size + 1
+            for i in self.empty:
+                if values[i]:
+                    continue
+                mask = self.full_mask & ~(rows[i // size] | cols[i % size] | boxes[box_of[i]])
+                if not mask:
+                    best_count = 0
+                    break
+                count = bin(mask).count("1")
+                if count < best_count:
+                    best, best_mask, best_count = i, mask, count
+                    if count == 1:
+                        break
+            if best_count == 1:
+                self._place(best, best_mask)
+                trail.append(best)
+                continue
+            branches = None
+            if 1 < best_count <= size:
+                places, bit = self._fewest_places(best_count + 1)
+                if places is not None: # No more ways to place this digit than to fill the best cell
+                    if len(places) == 1:
+                        self._place(places[0], bit)
+                        trail.append(places[0])
+                        continue
+                    best_count = len(places)
+                    branches = [(i, bit) for i in places]
+            break
+        total = 0
+        if best_count == 0:
+            pass
+        elif best < 0:
+            found.append([values[r * size:(r + 1) * size] for r in range(size)])
+            total = 1
+        else:
+            if branches is None:
+                branches = [(best, 1 << (num - 1)) for num in iter_digits(best_mask)]
+            for i, bit in branches:
+                self._place(i, bit)
+                total += self._search(limit - total, found)
+                self._unplace(i)
+                if total >= limit:
+                    break
+        for i in reversed(trail):
+            self._unplace(i)
+        return total
+
+    def _fewest_places(self, below):
+        # the digit with the fewest places left in any unit, if that's fewer than below: returns (places, bit),
+        # where no places means a dead end, or (None, 0). at_least[k] holds the digits seen in k + 1 or more
+        # places of the unit so far, so only counts under below are ever tracked
+        size, values, rows, cols, boxes, box_of = self.size, self.values, self.rows, self.cols, self.boxes, self.box_of
+        best = None
+        for unit in self.units:
+            placed = 0
+            at_least = [0] * below
+            for i in unit:
+                if values[i]:
+                    placed |= 1 << (values[i] - 1)
+                else:
+                    mask = self.full_mask & ~(rows[i // size] | cols[i % size] | boxes[box_of[i]])
+                    for k in range(below - 1, 0, -1):
+                        at_least[k] |= at_least[k - 1] & mask
+                    at_least[0] |= mask
+            if self.full_mask & ~(placed | at_least[0]):
+                return [], 0
+            for k in range(below - 1):
+                exact = at_least[k] & ~at_least[k + 1]
+                if exact:
+                    bit = exact & -exact
+                    best = ([i for i in unit if not values[i]
+                             and not (rows[i // size] | cols[i % size] | boxes[box_of[i]]) & bit], bit)
+                    if k == 0:
+                        return best
+                    below = k + 1
+                    at_least = at_least[:below]
+                    break
+        return best or (None, 0)
+
+    def solutions(self, limit=1):
+        found = []
+        if self.ok:
+            self._search(limit, found)
+        return found
+
+
+_COVERS = {}
+
+
+def _cover_rows(size):
+    # Algorithm X rows: candidate (r, c, d) -> the four constraints it satisfies
+    if size not in _COVERS:
+        box_length, box_index, peers = unit_tables(size)
+        rows = {}
+        for r in range(size):
+            for c in range(size):
+                for d in range(1, size + 1):
+                    rows[(r, c, d)] = (("cell", r, c), ("row", r, d), ("col", c, d), ("box", box_index[r][c], d))
+        _COVERS[size] = rows
+    return _COVERS[size]
+
+
+class DLXEngine:
+    # exact cover with Knuth's Algorithm X; covers are kept as dicts of sets, which gives the same
+    # O(1) remove/restore that dancing links does with pointers
+    def __init__(self, board):
+        check_givens(board)
+        self.size = len(board)
+        self.Y = _cover_rows(self.size)
+        self.X = {}
+        for row, constraints in self.Y.items():
+            for constraint in constraints:
+                self.X.setdefault(constraint, set()).add(row)
+        self.partial = []
+        self.ok = True
+        for r in range(self.size):
+            for c in range(self.size):
+                d = board[r][c]
+                if d:
+                    if any((r, c, d) not in self.X.get(j, ()) for j in self.Y[(r, c, d)]):
+                        self.ok = False
+                        return
+                    self._select((r, c, d))
+                    self.partial.append((r, c, d))
+
+    def _select(self, row):
+        X, Y = self.X, self.Y
+        removed = []
+        for j in Y[row]:
+            for i in X[j]:
+                for k in Y[i]:
+                    if k != j:
+                        X[k].discard(i)
+            removed.append(X.pop(j))
+        return removed
+
+    def _deselect(self, row, removed):
+        X, Y = self.X, self.Y
+        for j in reversed(Y[row]):
+            X[j] = removed.pop()
+            for i in X[j]:
+                for k in Y[i]:
+                    if k != j:
+                        X[k].add(i)
+
+    def _search(self, limit, found):
+        X = self.X
+        if not X:
+            board = [[0] * self.size for _ in range(self.size)]
+            for r, c, d in self.partial:
+                board[r][c] = d
+            found.append(board)
+            return 1
+        column = min(X, key=lambda j: len(X[j]))
+        total = 0
+        for row in list(X[column]):
+            removed = self._select(row)
+            self.partial.append(row)
+            total += self._search(limit - total, found)
+            self.partial.pop()
+            self._deselect(row, removed)
+            if total >= limit:
+                break
+        return total
+
+    def solutions(self, limit=1):
+        found = []
+        if self.ok:
+            self._search(limit, found)
+        return found
+
+
+ENGINES = {"bitmask": BitmaskEngine, "dlx": DLXEngine}
+DEFAULT_ENGINE = "bitmask"
+
+
+def register_engine(name, engine):
+    # engine(board).solutions(limit) must return a list of solved boards
+    ENGINES[name] = engine
+
+
+def solve(board, engine=DEFAULT_ENGINE):
+    # first solution as a list of lists, or None
+    found = ENGINES[engine](board).solutions(1)
+    return found[0] if found else None
+
+
+def count_solutions(board, limit=2, engine=DEFAULT_ENGINE):
+    # stops as soon as limit solutions are found; limit=2 answers "is it unique?"
+    return len(ENGINES[engine](board).solutions(limit))
+
+
+def _solve_line(task):
+    line, engine, verify = task
+    fields = line.split()
+    try:
+        found = ENGINES[engine](line_to_board(fields[0])).solutions(2 if verify else 1)
+    except ValueError: # malformed line or givens out of range: reported like an unsolvable puzzle
+        found = []
+    solution = board_to_line(found[0]) if found else None
+    if not verify:
+        return fields[0], solution, None
+    # verifying: exactly one solution, matching the stored one when the line carries it
+    ok = len(found) == 1 and (len(fields) < 2 or fields[1] == solution)
+    return fields[0], solution, ok
+
+
+def solve_lines(lines, engine=DEFAULT_ENGINE, workers=None, verify=False, chunksize=64):
+    # yields (puzzle, solution or None, verified or None) in input order, streaming across processes
+    tasks = ((line, engine, verify) for line in lines if line.strip())
+    if workers == 1:
+        for task in tasks:
+            yield _solve_line(task)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(_solve_line, tasks, chunksize)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve or re-verify puzzles in bulk.")
+    parser.add_argument("input", nargs="?", default="-", help="one puzzle per line, optionally followed by its solution")
+    parser.add_argument("-o", "--output", default="-")
+    parser.add_argument("-e", "--engine", choices=sorted(ENGINES), default=DEFAULT_ENGINE)
+    parser.add_argument("-w", "--workers", type=int, default=None)
+    parser.add_argument("--verify", action="store_true", help="check uniqueness and any stored solution")
+    args = parser.parse_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    start = time.perf_counter()
+    solved = failed = 0
+    try:
+        for puzzle, solution, ok in solve_lines(source, args.engine, args.workers, args.verify):
+            if solution is None or ok is False:
+                failed += 1
+            else:
+                solved += 1
+            if args.verify:
+                if not ok:
+                    out.write("%s %s\n" % (puzzle, solution or "-"))
+            else:
+                out.write("%s %s\n" % (puzzle, solution or "-"))
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+    total = solved + failed
+    print("%d puzzles, %d %s in %.2fs (%.1f puzzles/sec)" % (
+        total, failed, "failed verification" if args.verify else "unsolved", seconds,
+        total / seconds if seconds else 0.0), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
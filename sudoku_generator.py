@@ -1,12 +1,71 @@
-import math,random
+import math,random,time
+import profiler
+
+DIFFICULTY_REMOVED = {'easy': 30, 'medium': 40, 'hard': 50}
+SYMBOLS = "0123456789ABCDEFGHIJKLMNOP"
+SIZES = (4, 9, 16)  # grid sizes the services build on demand; 25x25 works but takes seconds per grid
+NODE_BUDGET = 4  # search nodes allowed per cell of the grid before an attempt or a uniqueness check gives up
+
+_TABLES = {}
+
+def removed_for(size, difficulty):
+    # the 9x9 removal counts scaled to other grid sizes
+    return DIFFICULTY_REMOVED[difficulty] * size * size // 81
+
+def board_to_line(board):
+    # one character per cell, row by row, 0 for blanks and letters past 9
+    return "".join(SYMBOLS[v] for row in board for v in row)
+
+def line_to_board(line):
+    line = line.strip()
+    size = int(math.sqrt(len(line)))
+    values = [SYMBOLS.index(ch) if ch in SYMBOLS else 0 for ch in line.upper()]
+    return [values[r * size:(r + 1) * size] for r in range(size)]
+
+def unit_tables(size):
+    # box index and peer list for every cell, built once per grid size and shared
+    if size not in _TABLES:
+        box_length = int(math.sqrt(size))
+        if box_length * box_length != size:
+            raise ValueError("row_length must be a perfect square, got %d" % size)
+        box_index = [[(r // box_length) * box_length + c // box_length for c in range(size)]
+                     for r in range(size)]
+        peers = []
+        for r in range(size):
+            row_peers = []
+            for c in range(size):
+                br = r - r % box_length
+                bc = c - c % box_length
+                cells = set((r, j) for j in range(size))
+                cells.update((i, c) for i in range(size))
+                cells.update((br + i, bc + j) for i in range(box_length) for j in range(box_length))
+                cells.discard((r, c))
+                row_peers.append(tuple(sorted(cells)))
+            peers.append(row_peers)
+        _TABLES[size] = (box_length, box_index, peers)
+    return _TABLES[size]
+
+def iter_digits(mask):
+    # yields the digits whose bits are set in mask, lowest first
+    while mask:
+        bit = mask & -mask
+        mask ^= bit
+        yield bit.bit_length()
 
 class SudokuGenerator:
 
-    def __init__(self, row_length, removed_cells):
+    def __init__(self, row_length, removed_cells, seed=None):
         self.row_length = row_length
         self.removed_cells = removed_cells
+        self.rng = random.Random(seed)  # private, so the same seed always gives the same puzzle
         self.board = [[0 for _ in range(row_length)] for _ in range(row_length)]
-        self.box_length = int(math.sqrt(row_length))
+        self.box_length, self.box_index, self.peers = unit_tables(row_length)
+        # bit (num - 1) is set when num is already used in that row/col/box
+        self.full_mask = (1 << row_length) - 1
+        self.row_masks = [0] * row_length
+        self.col_masks = [0] * row_length
+        self.box_masks = [0] * row_length
+        self.nodes_left = None  # node budget for _count, None for no limit
 
     def get_board(self):
         return self.board
@@ -15,87 +74,253 @@ class SudokuGenerator:
         for row in self.board:
            print(row)
 
+    def place(self, row, col, num):
+        bit = 1 << (num - 1)
+        self.board[row][col] = num
+        self.row_masks[row] |= bit
+        self.col_masks[col] |= bit
+        self.box_masks[self.box_index[row][col]] |= bit
+
+    def unplace(self, row, col):
+        num = self.board[row][col]
+        if num:
+            bit = ~(1 << (num - 1))
+            self.board[row][col] = 0
+            self.row_masks[row] &= bit
+            self.col_masks[col] &= bit
+            self.box_masks[self.box_index[row][col]] &= bit
+
+    def candidates(self, row, col):
+        # bitmask of the digits that can still go in (row, col)
+        used = self.row_masks[row] | self.col_masks[col] | self.box_masks[self.box_index[row][col]]
+        return self.full_mask & ~used
+
+    def dead_end(self, row, col):
+        # forward check: a placement is hopeless if it leaves an empty peer with no candidates
+        board = self.board
+        for r, c in self.peers[row][col]:
+            if board[r][c] == 0 and not self.candidates(r, c):
+                return True
+        return False
+
     def valid_in_row(self, row, num):
-        return num not in self.board[row]
+        return not self.row_masks[row] & (1 << (num - 1))
 
     def valid_in_col(self, col, num):
-        for row in range(self.row_length):
-            if self.board[row][col] == num:
-                return False
-        return True
-
+        return not self.col_masks[col] & (1 << (num - 1))
 
     def valid_in_box(self, row_start, col_start, num):
-        for i in range(3):
-            for j in range(3):
-                if self.board[row_start + i][col_start + j] == num:
-                    return False
-        return True
+        return not self.box_masks[self.box_index[row_start][col_start]] & (1 << (num - 1))
 
     def is_valid(self, row, col, num):
-        return (self.valid_in_row(row, num) and
-                self.valid_in_col(col, num) and
-                self.valid_in_box(row - row % 3, col - col % 3, num))
+        return bool(self.candidates(row, col) & (1 << (num - 1)))
 
     def fill_box(self, row_start, col_start):
         nums = list(range(1, self.row_length + 1))
-        random.shuffle(nums)
+        self.rng.shuffle(nums)
         i = 0
-        for r in range(row_start, row_start + 3):
-            for c in range(col_start, col_start + 3):
-                self.board[r][c] = nums[i]
+        for r in range(row_start, row_start + self.box_length):
+            for c in range(col_start, col_start + self.box_length):
+                self.place(r, c, nums[i])
                 i += 1
 
     def fill_diagonal(self):
         for i in range(0, self.row_length, self.box_length):
             self.fill_box(i, i)
 
-    def fill_remaining(self, row, col):
-        if (col >= self.row_length and row < self.row_length - 1):
-            row += 1
-            col = 0
-        if row >= self.row_length and col >= self.row_length:
-            return True
-        if row < self.box_length:
-            if col < self.box_length:
-                col = self.box_length
-        elif row < self.row_length - self.box_length:
-            if col == int(row // self.box_length * self.box_length):
-                col += self.box_length
+    def most_constrained(self):
+        # the empty cell with the fewest candidates, or None when the board is full
+        best = None
+        best_count = self.row_length + 1
+        for r in range(self.row_length):
+            for c in range(self.row_length):
+                if self.board[r][c] == 0:
+                    count = bin(self.candidates(r, c)).count("1")
+                    if count < best_count:
+                        best, best_count = (r, c), count
+                        if count <= 1:
+                            return best
+        return best
+
+    def fill_iterative(self, budget=None, deadline=None):
+        # most-constrained-cell search on an explicit stack, trying each cell's digits in random order.
+        # Gives up (False) after budget placements; raises TimeoutError once time.perf_counter() passes deadline
+        stack = []  # (row, col, digits still to try)
+        nodes = 0
+        while True:
+            cell = self.most_constrained()
+            if cell is None:
+                return True
+            row, col = cell
+            choices = list(iter_digits(self.candidates(row, col)))
+            self.rng.shuffle(choices)
+            stack.append((row, col, choices))
+            while stack:
+                row, col, choices = stack[-1]
+                self.unplace(row, col)
+                if not choices:
+                    stack.pop()
+                    continue
+                self.place(row, col, choices.pop())
+                nodes += 1
+                if budget is not None and nodes > budget:
+                    return False
+                if deadline is not None and time.perf_counter() > deadline:
+                    raise TimeoutError("no %dx%d grid before the deadline" % (self.row_length, self.row_length))
+                if not self.dead_end(row, col):
+                    break
+            else:
+                return False
+
+    def reset(self):
+        for row in self.board:
+            row[:] = [0] * self.row_length
+        self.row_masks = [0] * self.row_length
+        self.col_masks = [0] * self.row_length
+        self.box_masks = [0] * self.row_length
+
+    @profiler.timed("generator.fill_values")
+    def fill_values(self, deadline=None):
+        # an attempt that runs through its node budget starts over from a fresh diagonal, so one bad start
+        # can't run on; deadline is a time.perf_counter() value after which TimeoutError is raised
+        budget = NODE_BUDGET * self.row_length * self.row_length
+        while True:
+            self.fill_diagonal()
+            try:
+                filled = self.fill_iterative(budget, deadline)
+            except TimeoutError:
+                self.reset()
+                raise
+            if filled:
+                return
+            self.reset()
+
+    def load(self, board):
+        # copies givens in through place(); False if two givens clash
+        self.reset()
+        for r in range(self.row_length):
+            for c in range(self.row_length):
+                num = board[r][c]
+                if num:
+                    if not self.is_valid(r, c, num):
+                        return False
+                    self.place(r, c, num)
+        return True
+
+    def empty_cells(self):
+        return [(r, c) for r in range(self.row_length) for c in range(self.row_length) if self.board[r][c] == 0]
+
+    def count_solutions(self, limit=2):
+        # counts completions of the current board, stopping as soon as limit is reached
+        return self._count(self.empty_cells(), limit)
+
+    def _count(self, empty, limit):
+        # empty is shared with the caller and handed back in its original order
+        if not empty:
+            return 1
+        if self.nodes_left is not None:
+            self.nodes_left -= 1
+            if self.nodes_left < 0:
+                return limit  # out of budget: report the limit so callers treat the answer as "not unique"
+        best_i = 0
+        best_mask = 0
+        best_count = self.row_length + 1
+        for i, (r, c) in enumerate(empty):
+            mask = self.candidates(r, c)
+            count = bin(mask).count("1")
+            if count < best_count:
+                if count == 0:
+                    return 0
+                best_i, best_mask, best_count = i, mask, count
+                if count == 1:
+                    break
+        row, col = empty[best_i]
+        empty[best_i] = empty[-1]
+        empty.pop()
+        total = 0
+        for num in iter_digits(best_mask):
+            self.place(row, col, num)
+            total += self._count(empty, limit - total)
+            self.unplace(row, col)
+            if total >= limit:
+                break
+        if best_i < len(empty):
+            empty.append(empty[best_i])
+            empty[best_i] = (row, col)
         else:
-            if col == self.row_length - self.box_length:
-                row += 1
-                col = 0
-                if row >= self.row_length:
-                    return True
-        
-        for num in range(1, self.row_length + 1):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.fill_remaining(row, col + 1):
+            empty.append((row, col))
+        return total
+
+    def has_other_solution(self, row, col, num, empty, budget=None):
+        # after blanking (row, col), does some digit other than num still complete the board?
+        # A check that runs out of budget answers True, which keeps the given and the puzzle unique
+        self.nodes_left = budget
+        try:
+            for other in iter_digits(self.candidates(row, col) & ~(1 << (num - 1))):
+                self.place(row, col, other)
+                found = self._count(empty, 1)
+                self.unplace(row, col)
+                if found:
                     return True
-                self.board[row][col] = 0
-        return False
+            return False
+        finally:
+            self.nodes_left = None
 
+    @profiler.timed("generator.remove_cells")
+    def remove_cells(self, unique=False, minimal=False, deadline=None):
+        # blanks cells in a shuffled order and returns how many were removed
+        cells = [(r, c) for r in range(self.row_length) for c in range(self.row_length) if self.board[r][c] != 0]
+        self.rng.shuffle(cells)
+        if not unique:
+            for row, col in cells[:self.removed_cells]:
+                self.unplace(row, col)
+            return min(self.removed_cells, len(cells))
+        # keep a cell only when blanking it would allow a second solution. minimal keeps digging past
+        # removed_cells until no given can be dropped; passing deadline stops early with fewer removed.
+        # A check cut short by the node budget keeps a given that might have gone, which a minimal puzzle
+        # can't afford, so minimal checks run to the end
+        budget = None if minimal else NODE_BUDGET * self.row_length * self.row_length
+        empty = self.empty_cells()
+        removed = 0
+        for row, col in cells:
+            if removed >= self.removed_cells and not minimal:
+                break
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            num = self.board[row][col]
+            self.unplace(row, col)
+            if self.has_other_solution(row, col, num, empty, budget):
+                self.place(row, col, num)
+            else:
+                empty.append((row, col))
+                removed += 1
+        return removed
 
-    def fill_values(self):
-        self.fill_diagonal()
-        self.fill_remaining(0, self.box_length)
 
-    def remove_cells(self):
-        cells_to_remove = self.removed_cells
-        while cells_to_remove > 0:
-            row = random.randrange(self.row_length)
-            col = random.randrange(self.row_length)
-            if self.board[row][col] != 0:
-                self.board[row][col] = 0
-                cells_to_remove -= 1
+def check_board(board):
+    # True when every row, column and box holds each digit exactly once
+    size = len(board)
+    box_length, box_index, peers = unit_tables(size)
+    rows = [set() for _ in range(size)]
+    cols = [set() for _ in range(size)]
+    boxes = [set() for _ in range(size)]
+    for r in range(size):
+        for c in range(size):
+            num = board[r][c]
+            rows[r].add(num)
+            cols[c].add(num)
+            boxes[box_index[r][c]].add(num)
+    digits = set(range(1, size + 1))
+    return all(unit == digits for unit in rows + cols + boxes)
 
 
-def generate_sudoku(size, removed):
-    sudoku = SudokuGenerator(size, removed)
-    sudoku.fill_values()
+def generate_sudoku(size, removed, unique=False, timeout=None, seed=None):
+    # timeout in seconds: the fill raises TimeoutError past it, unique digging stops with what it has.
+    # A seed makes the result repeatable, as long as no timeout cuts it short
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    sudoku = SudokuGenerator(size, removed, seed)
+    sudoku.fill_values(deadline)
     board = sudoku.get_board()
-    sudoku.remove_cells()
+    sudoku.remove_cells(unique, deadline=deadline)
     board = sudoku.get_board()
     return board
@@ -0,0 +1,109 @@
+import math,random,time
+from sudoku_generator import SudokuGenerator, generate_sudoku
+
+# Validity-preserving shuffles of known grids: digit relabeling, row swaps within a band, band swaps,
+# column swaps within a stack, stack swaps and transposition. A transformed puzzle keeps exactly as
+# many solutions as its seed, so unique seeds give unique puzzles with no search.
+# Seeds come from fixed per-seed RNG seeds, so every process builds the same library and a seeded rng
+# picks the same puzzles everywhere.
+SEED_COUNT = 8
+
+_grids = {}    # size -> solved seed grids
+_puzzles = {}  # (size, removed) -> (puzzle, solution) seeds known to have one solution
+_seeded = set()  # (size, removed) keys that have already had their one round of digging
+
+
+def pattern_grid(size):
+    # the textbook shifted-row solution, valid for any square box size
+    box = int(math.sqrt(size))
+    return [[(box * (r % box) + r // box + c) % size + 1 for c in range(size)] for r in range(size)]
+
+
+def random_transform(size, rng=random):
+    # returns (rows, cols, relabel, transpose) describing one random symmetry
+    box = int(math.sqrt(size))
+
+    def order():
+        bands = list(range(box))
+        rng.shuffle(bands)
+        out = []
+        for band in bands:
+            inner = list(range(box))
+            rng.shuffle(inner)
+            out.extend(band * box + i for i in inner)
+        return out
+
+    digits = list(range(1, size + 1))
+    rng.shuffle(digits)
+    return order(), order(), [0] + digits, rng.random() < 0.5
+
+
+def apply_transform(board, transform):
+    rows, cols, relabel, transpose = transform
+    if transpose:
+        return [[relabel[board[c][r]] for c in cols] for r in rows]
+    return [[relabel[board[r][c]] for c in cols] for r in rows]
+
+
+def transform_puzzle(puzzle, solution=None, rng=random):
+    # one random symmetry applied to the puzzle and, if given, its solution
+    t = random_transform(len(puzzle), rng)
+    if solution is None:
+        return apply_transform(puzzle, t)
+    return apply_transform(puzzle, t), apply_transform(solution, t)
+
+
+def seed_grids(size, deadline=None):
+    # deadline is a time.perf_counter() value; a build cut short by it raises TimeoutError and the next call
+    # carries on from the same grid
+    grids = _grids.setdefault(size, [pattern_grid(size)])
+    for i in range(len(grids), SEED_COUNT):
+        generator = SudokuGenerator(size, 0, seed="grid-%d-%d" % (size, i))
+        generator.fill_values(deadline)
+        grids.append(generator.get_board())
+    return grids
+
+
+def add_seed(puzzle, solution):
+    # registers a puzzle already known to have a unique solution
+    removed = sum(v == 0 for row in puzzle for v in row)
+    _puzzles.setdefault((len(puzzle), removed), []).append((puzzle, solution))
+
+
+def seed_puzzles(size, removed, deadline=None):
+    # digs seeds once per key and stops at the first dig that falls short of removed, so a size digging
+    # can't reach costs one dig the first time and nothing after. A dig cut short by the deadline
+    # raises TimeoutError instead, and doesn't count
+    key = (size, removed)
+    if key not in _seeded:
+        for i in range(len(_puzzles.get(key, ())), SEED_COUNT):
+            generator = SudokuGenerator(size, removed, seed="puzzle-%d-%d-%d" % (size, removed, i))
+            generator.fill_values(deadline)
+            solution = [row[:] for row in generator.get_board()]
+            if generator.remove_cells(unique=True, deadline=deadline) != removed:
+                if deadline is not None and time.perf_counter() > deadline:
+                    raise TimeoutError("no %dx%d seed puzzle before the deadline" % (size, size))
+                break
+            add_seed(generator.get_board(), solution)
+        _seeded.add(key)
+    return _puzzles.get(key, [])
+
+
+def generate_sudoku_fast(size, removed, unique=False, timeout=None, seed=None, rng=random):
+    # same contract as generate_sudoku; seeds are built on first use, every later call is a shuffle.
+    # seed (or a seeded rng) repeats a puzzle across processes; timeout also covers building the seeds
+    if seed is not None:
+        rng = random.Random(seed)
+    deadline = None if timeout is None else time.perf_counter() + timeout
+    if unique:
+        seeds = seed_puzzles(size, removed, deadline)
+        if seeds:
+            puzzle, solution = rng.choice(seeds)
+            return transform_puzzle(puzzle, None, rng)
+        # digging never reached removed for this size
+        left = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        return generate_sudoku(size, removed, unique, left, rng.randrange(1 << 30))
+    board = apply_transform(rng.choice(seed_grids(size, deadline)), random_transform(size, rng))
+    for index in rng.sample(range(size * size), removed):
+        board[index // size][index % size] = 0
+    return board
@@ -1,122 +1,104 @@
 import pygame
-import math
+import glyphs
+import profiler
 from cell import Cell
-from sudoku_generator import *
+from game import Game
+from sudoku_generator import SudokuGenerator
 
-from constants import WIDTH, HEIGHT, N_CELLS, CELL_SIZE
+from constants import N_CELLS, CELL_SIZE
+
+GRID_SIZE = N_CELLS * CELL_SIZE[0] # The grid itself; the number row and buttons sit below it
 
-pygame.font.init()
 
 class Table:
     def __init__(self, screen):
         self.screen = screen
-        self.puzzle = (N_CELLS, (N_CELLS * N_CELLS) // 2)
-        self.answers = self.puzzle.puzzle_answers()
-        self.answerable_table = self.puzzle.puzzle_table()
-        self.SRN = self.puzzle.SRN
+        generator = SudokuGenerator(N_CELLS, (N_CELLS * N_CELLS) // 2)
+        generator.fill_values()
+        self.answers = [row[:] for row in generator.get_board()]
+        generator.remove_cells(unique=True)
+        self.answerable_table = generator.get_board()
+        self.game = Game(self.answerable_table, self.answers, lives=3) # Rules, lives and the win check
+        self.SRN = self.game.box_length
         self.table_cells = []
+        self.grid = [[None] * N_CELLS for _ in range(N_CELLS)] # grid[y][x], for O(1) lookups by position
         self.num_choices = []
         self.clicked_cell = None
         self.clicked_num_below = None
         self.cell_to_empty = None
         self.making_move = False
         self.guess_mode = True
-        self.lives = 3
         self.game_over = False
-        self.delete_button = pygame.Rect(0, (HEIGHT + CELL_SIZE[1]), (CELL_SIZE[0] * 3), (CELL_SIZE[1]))
-        self.guess_button = pygame.Rect((CELL_SIZE[0] * 6), (HEIGHT + CELL_SIZE[1]), (CELL_SIZE[0] * 3), (CELL_SIZE[1]))
-        self.font = pygame.font.SysFont('Bauhaus 93', (CELL_SIZE[0] // 2))
-        self.font_color = pygame.Color("white")
+        self.delete_button = pygame.Rect(0, (GRID_SIZE + CELL_SIZE[1]), (CELL_SIZE[0] * 3), (CELL_SIZE[1]))
+        self.guess_button = pygame.Rect((CELL_SIZE[0] * 6), (GRID_SIZE + CELL_SIZE[1]), (CELL_SIZE[0] * 3), (CELL_SIZE[1]))
+        self.font_color = (255, 255, 255)
         self._generate_game()
 
+    @property
+    def lives(self):
+        return self.game.lives
+
     def _generate_game(self):
         # generating sudoku table
         for y in range(N_CELLS):
             for x in range(N_CELLS):
                 cell_value = self.answerable_table[y][x]
                 is_correct_guess = True if cell_value != 0 else False
-                self.table_cells.append(Cell(x, y, CELL_SIZE, cell_value, is_correct_guess))
+                cell = Cell(x, y, CELL_SIZE, cell_value, is_correct_guess)
+                self.table_cells.append(cell)
+                self.grid[y][x] = cell
         # generating number choices
         for x in range(N_CELLS):
             self.num_choices.append(Cell(x, N_CELLS, CELL_SIZE, x + 1))
 
     def _draw_grid(self):
         grid_color = (50, 80, 80)
-        pygame.draw.rect(self.screen, grid_color, (-3, -3, WIDTH + 6, HEIGHT + 6), 6)
+        pygame.draw.rect(self.screen, grid_color, (-3, -3, GRID_SIZE + 6, GRID_SIZE + 6), 6)
         i = 1
-        while (i * CELL_SIZE[0]) < WIDTH:
-            line_size = 2 if i % 3 > 0 else 4
+        while (i * CELL_SIZE[0]) < GRID_SIZE:
+            line_size = 2 if i % self.SRN > 0 else 4
             pygame.draw.line(self.screen, grid_color, ((i * CELL_SIZE[0]) - (line_size // 2), 0),
-                             ((i * CELL_SIZE[0]) - (line_size // 2), HEIGHT), line_size)
+                             ((i * CELL_SIZE[0]) - (line_size // 2), GRID_SIZE), line_size)
             pygame.draw.line(self.screen, grid_color, (0, (i * CELL_SIZE[0]) - (line_size // 2)),
-                             (HEIGHT, (i * CELL_SIZE[0]) - (line_size // 2)), line_size)
+                             (GRID_SIZE, (i * CELL_SIZE[0]) - (line_size // 2)), line_size)
             i += 1
 
     def _draw_buttons(self):
         # adding delete button details
         dl_button_color = pygame.Color("red")
         pygame.draw.rect(self.screen, dl_button_color, self.delete_button)
-        del_msg = self.font.render("Delete", True, self.font_color)
+        del_msg = glyphs.text("Delete", CELL_SIZE[0] // 2, self.font_color, 'Bauhaus 93', True)
         self.screen.blit(del_msg,
                          (self.delete_button.x + (CELL_SIZE[0] // 2), self.delete_button.y + (CELL_SIZE[1] // 4)))
         # adding guess button details
         gss_button_color = pygame.Color("blue") if self.guess_mode else pygame.Color("purple")
         pygame.draw.rect(self.screen, gss_button_color, self.guess_button)
-        gss_msg = self.font.render("Guess: On" if self.guess_mode else "Guess: Off", True, self.font_color)
+        gss_msg = glyphs.text("Guess: On" if self.guess_mode else "Guess: Off", CELL_SIZE[0] // 2, self.font_color,
+                              'Bauhaus 93', True)
         self.screen.blit(gss_msg,
                          (self.guess_button.x + (CELL_SIZE[0] // 3), self.guess_button.y + (CELL_SIZE[1] // 4)))
 
     def _get_cell_from_pos(self, pos):
-        for cell in self.table_cells:
-            if (cell.row, cell.col) == (pos[0], pos[1]):
-                return cell
-
-    def _not_in_row(self, row, num):
-        for cell in self.table_cells:
-            if cell.row == row:
-                if cell.value == num:
-                    return False
-        return True
-
-    def _not_in_col(self, col, num):
-        for cell in self.table_cells:
-            if cell.col == col:
-                if cell.value == num:
-                    return False
-        return True
+        return self.grid[pos[1]][pos[0]]
 
-    def _not_in_subgroup(self, rowstart, colstart, num):
-        for x in range(self.SRN):
-            for y in range(self.SRN):
-                current_cell = self._get_cell_from_pos((rowstart + x, colstart + y))
-                if current_cell.value == num:
-                    return False
-        return True
-
-        # remove numbers in guess if number already guessed in the same row, col, subgroup correctly
-
-    def _remove_guessed_num(self, row, col, rowstart, colstart, num):
-        for cell in self.table_cells:
-            if cell.row == row and cell.guesses != None:
-                for x_idx, guess_row_val in enumerate(cell.guesses):
-                    if guess_row_val == num:
-                        cell.guesses[x_idx] = 0
-            if cell.col == col and cell.guesses != None:
-                for y_idx, guess_col_val in enumerate(cell.guesses):
-                    if guess_col_val == num:
-                        cell.guesses[y_idx] = 0
-        for x in range(self.SRN):
-            for y in range(self.SRN):
-                current_cell = self._get_cell_from_pos((rowstart + x, colstart + y))
-                if current_cell.guesses != None:
-                    for idx, guess_val in enumerate(current_cell.guesses):
-                        if guess_val == num:
-                            current_cell.guesses[idx] = 0
+    def _sync(self):
+        # copy what the game changed into the drawing cells; a cell's row is its x and its col its y
+        game = self.game
+        for y, x in game.changed:
+            cell = self.grid[y][x]
+            cell.value = game.model.get(y, x)
+            cell.is_correct_guess = cell.value != 0 and cell.value == self.answers[y][x]
+            if cell.is_correct_guess:
+                cell.guesses = None
+            else:
+                marks = game.model.marks[y * N_CELLS + x]
+                cell.guesses = [num if marks & (1 << (num - 1)) else 0 for num in range(1, N_CELLS + 1)]
+        game.changed.clear()
 
     def handle_mouse_click(self, pos):
         x, y = pos[0], pos[1]
         # getting table cell clicked
-        if x <= WIDTH and y <= HEIGHT:
+        if x < GRID_SIZE and y < GRID_SIZE:
             x = x // CELL_SIZE[0]
             y = y // CELL_SIZE[1]
             clicked_cell = self._get_cell_from_pos((x, y))
@@ -125,64 +107,45 @@ class Table:
                 self.clicked_cell = clicked_cell
                 self.making_move = True
             # clicked unempty cell but with wrong number guess
-            elif clicked_cell.value != 0 and clicked_cell.value != self.answers[y][x]:
+            elif clicked_cell.value != self.answers[y][x]:
                 self.cell_to_empty = clicked_cell
         # getting number selected
-        elif x <= WIDTH and y >= HEIGHT and y <= (HEIGHT + CELL_SIZE[1]):
+        elif x < GRID_SIZE and y >= GRID_SIZE and y <= (GRID_SIZE + CELL_SIZE[1]):
             x = x // CELL_SIZE[0]
             self.clicked_num_below = self.num_choices[x].value
         # deleting numbers
-        elif x <= (CELL_SIZE[0] * 3) and y >= (HEIGHT + CELL_SIZE[1]) and y <= (HEIGHT + CELL_SIZE[1] * 2):
+        elif x <= (CELL_SIZE[0] * 3) and y >= (GRID_SIZE + CELL_SIZE[1]) and y <= (GRID_SIZE + CELL_SIZE[1] * 2):
             if self.cell_to_empty:
-                self.cell_to_empty.value = 0
+                self.game.select(self.cell_to_empty.col, self.cell_to_empty.row)
+                self.game.clear()
                 self.cell_to_empty = None
         # selecting modes
-        elif x >= (CELL_SIZE[0] * 6) and y >= (HEIGHT + CELL_SIZE[1]) and y <= (HEIGHT + CELL_SIZE[1] * 2):
+        elif x >= (CELL_SIZE[0] * 6) and y >= (GRID_SIZE + CELL_SIZE[1]) and y <= (GRID_SIZE + CELL_SIZE[1] * 2):
             self.guess_mode = True if not self.guess_mode else False
         # if making a move
         if self.clicked_num_below and self.clicked_cell != None and self.clicked_cell.value == 0:
-            current_row = self.clicked_cell.row
-            current_col = self.clicked_cell.col
-            rowstart = self.clicked_cell.row - self.clicked_cell.row % self.SRN
-            colstart = self.clicked_cell.col - self.clicked_cell.col % self.SRN
+            self.game.select(self.clicked_cell.col, self.clicked_cell.row)
             if self.guess_mode:
-                # checking the vertical group, the horizontal group, and the subgroup
-                if self._not_in_row(current_row, self.clicked_num_below) and self._not_in_col(current_col,
-                                                                                              self.clicked_num_below):
-                    if self._not_in_subgroup(rowstart, colstart, self.clicked_num_below):
-                        if self.clicked_cell.guesses != None:
-                            self.clicked_cell.guesses[self.clicked_num_below - 1] = self.clicked_num_below
+                # pencil mark, if the row, column and subgroup still allow the number
+                self.game.note(self.clicked_num_below)
             else:
-                self.clicked_cell.value = self.clicked_num_below
-                # if the player guess correctly
-                if self.clicked_num_below == self.answers[self.clicked_cell.col][self.clicked_cell.row]:
-                    self.clicked_cell.is_correct_guess = True
-                    self.clicked_cell.guesses = None
-                    self._remove_guessed_num(current_row, current_col, rowstart, colstart, self.clicked_num_below)
-                # if guess is wrong
-                else:
-                    self.clicked_cell.is_correct_guess = False
-                    self.clicked_cell.guesses = [0 for x in range(9)]
-                    self.lives -= 1
+                # a wrong number costs a life and stays until deleted
+                self.game.place(self.clicked_num_below)
             self.clicked_num_below = None
             self.making_move = False
         else:
             self.clicked_num_below = None
+        self._sync()
 
     def _puzzle_solved(self):
-        check = None
-        for cell in self.table_cells:
-            if cell.value == self.answers[cell.col][cell.row]:
-                check = True
-            else:
-                check = False
-                break
-        return check
+        return self.game.is_won()
 
+    @profiler.timed("table.update")
     def update(self):
+        self._sync()
         [cell.update(self.screen, self.SRN) for cell in self.table_cells]
         [num.update(self.screen) for num in self.num_choices]
         self._draw_grid()
         self._draw_buttons()
-        if self._puzzle_solved() or self.lives == 0:
-            self.game_over = True
\ No newline at end of file
+        if self.game.status != "playing":
+            self.game_over = True
@@ -0,0 +1,56 @@
+import random
+import time
+
+from canonical import EMPTY, HASH_BYTES, DedupIndex, canonical_form, import_lines, puzzle_hash
+from sudoku_generator import board_to_line, generate_sudoku
+from sudoku_transform import transform_puzzle
+
+
+def test_hash_invariant_under_symmetries():
+    rng = random.Random(7)
+    for size, removed in ((4, 8), (9, 45)):
+        board = generate_sudoku(size, removed, seed=size)
+        form = canonical_form(board)
+        key = puzzle_hash(board)
+        for _ in range(20):
+            copy = transform_puzzle(board, rng=rng)
+            assert canonical_form(copy) == form
+            assert puzzle_hash(copy) == key
+
+
+def test_different_puzzles_hash_apart():
+    keys = {puzzle_hash(generate_sudoku(9, 45, seed=seed)) for seed in range(10)}
+    assert len(keys) == 10
+    assert all(len(key) == HASH_BYTES for key in keys)
+
+
+def test_dedup_index_grows_and_reopens(tmp_path):
+    path = str(tmp_path / "dedup.idx")
+    keys = [random.Random(i).randbytes(HASH_BYTES) for i in range(100)] + [EMPTY]
+    with DedupIndex(path, slots=8) as index:
+        assert all(index.add(key) for key in keys)
+        assert not any(index.add(key) for key in keys)
+        assert len(index) == len(keys)
+        assert index.slots >= 2 * len(keys)
+    with DedupIndex(path) as index:
+        assert len(index) == len(keys)
+        assert all(key in index for key in keys)
+        assert bytes(HASH_BYTES - 1) + b"\2" not in index
+
+
+def test_import_lines_drops_equivalent_puzzles(tmp_path):
+    board = generate_sudoku(9, 45, seed=1)
+    lines = [board_to_line(board), board_to_line(transform_puzzle(board, rng=random.Random(2))),
+             board_to_line(generate_sudoku(9, 45, seed=2))]
+    with DedupIndex(str(tmp_path / "dedup.idx")) as index:
+        assert list(import_lines(lines, index)) == [lines[0], lines[2]]
+
+
+def test_canonical_form_throughput():
+    # dedup runs this on every generated puzzle, so it must stay well under the generator's own cost
+    boards = [generate_sudoku(9, 55, seed=seed) for seed in range(100)]
+    boards += [generate_sudoku(9, 0, seed=seed) for seed in range(10)]
+    start = time.perf_counter()
+    for board in boards:
+        canonical_form(board)
+    assert time.perf_counter() - start < 1.0
@@ -0,0 +1,150 @@
+import pytest
+
+from game import Game
+from solver import solve
+from sudoku_generator import generate_sudoku
+
+
+@pytest.fixture
+def puzzle():
+    board = generate_sudoku(9, 40, unique=True, seed=3)
+    return board, solve(board)
+
+
+def _blank(game):
+    # first empty cell and its answer
+    for row in range(game.size):
+        for col in range(game.size):
+            if not game.original[row][col]:
+                return row, col, game.solution[row][col]
+
+
+def _wrong(value, size=9):
+    return value % size + 1
+
+
+def test_givens_cannot_change(puzzle):
+    game = Game(*puzzle)
+    row, col = next((r, c) for r in range(9) for c in range(9) if puzzle[0][r][c])
+    game.select(row, col)
+    assert not game.place(_wrong(puzzle[0][row][col]))
+    assert not game.clear()
+
+
+def test_correct_digit_locks(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    assert game.place(answer)
+    assert not game.clear()
+    assert game.model.get(row, col) == answer
+
+
+def test_wrong_digit_can_be_cleared_with_lives(puzzle):
+    game = Game(*puzzle, lives=3)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    assert game.place(_wrong(answer))
+    assert game.clear()
+    assert game.model.get(row, col) == 0
+
+
+def test_wrong_digit_locks_without_lives(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    assert game.place(_wrong(answer))
+    assert not game.clear()
+    assert not game.place(answer)
+    assert game.model.get(row, col) == _wrong(answer)
+
+
+def test_hint_fixes_wrong_digit_with_lives(puzzle):
+    game = Game(*puzzle, lives=3)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    game.place(_wrong(answer))
+    assert "wrong" in game.hint()
+    assert (game.selected_row, game.selected_col) == (row, col)
+    assert game.place(game.model.sketches[row * 9 + col])
+    assert game.model.get(row, col) == answer
+
+
+def test_hint_goes_past_locked_wrong_digit(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    game.place(_wrong(answer))
+    for _ in range(20):
+        reason = game.hint()
+        hinted = (game.selected_row, game.selected_col)
+        assert "wrong" not in reason and hinted != (row, col)
+        assert game.model.sketches[hinted[0] * 9 + hinted[1]] == game.solution[hinted[0]][hinted[1]]
+        assert game.place(game.solution[hinted[0]][hinted[1]])
+
+
+def test_wrong_digit_costs_a_life_that_undo_keeps(puzzle):
+    game = Game(*puzzle, lives=2)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    game.place(_wrong(answer))
+    assert game.lives == 1
+    assert game.undo() and game.model.get(row, col) == 0
+    assert game.lives == 1
+    assert game.redo() and game.model.get(row, col) == _wrong(answer)
+    assert game.lives == 1
+    game.clear()
+    game.place(next(d for d in range(1, 10) if d not in (answer, _wrong(answer))))
+    assert game.lives == 0 and game.status == "lost"
+    game.reset()
+    assert game.lives == 2 and game.status == "playing"
+
+
+def test_undo_redo_round_trip(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    game.select(row, col)
+    game.sketch(answer)
+    game.place(answer)
+    after = game.model.to_board()
+    assert game.undo() and game.undo()
+    assert game.model.to_board() == [list(r) for r in game.original]
+    assert game.model.sketches[row * 9 + col] == 0
+    assert game.redo() and game.redo()
+    assert game.model.to_board() == after
+    assert not game.redo()
+
+
+def test_conflicts_tracked_through_undo(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    given = next(puzzle[0][row][c] for c in range(9) if puzzle[0][row][c])
+    game.select(row, col)
+    game.place(given)
+    assert (row, col) in game.conflicts
+    game.undo()
+    assert not game.conflicts and game.duplicates == 0
+
+
+def test_notes_only_for_candidates_and_cleared_by_placing(puzzle):
+    game = Game(*puzzle)
+    row, col, answer = _blank(game)
+    given = next(puzzle[0][row][c] for c in range(9) if puzzle[0][row][c])
+    game.select(row, col)
+    assert not game.note(given)
+    peer = next((r, c) for r, c in game.peers[row][col] if not puzzle[0][r][c])
+    game.select(*peer)
+    assert game.note(answer)
+    game.select(row, col)
+    game.place(answer)
+    assert not game.model.marks[peer[0] * 9 + peer[1]] & (1 << (answer - 1))
+
+
+def test_filling_the_solution_wins(puzzle):
+    game = Game(*puzzle)
+    for row in range(9):
+        for col in range(9):
+            if not game.original[row][col]:
+                game.select(row, col)
+                game.place(game.solution[row][col])
+    assert game.status == "won" and game.is_won() and game.check()
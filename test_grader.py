@@ -0,0 +1,25 @@
+from grader import TECHNIQUES, _Grader, grade
+from sudoku_generator import generate_sudoku
+
+
+def test_techniques_tried_cheapest_first():
+    weights = [weight for _, weight in TECHNIQUES]
+    assert weights == sorted(weights)
+
+
+def test_hidden_single_flags_two_digits_sharing_one_cell():
+    # 1 and 2 can only go in the top-left cell of row 0
+    board = [[0, 0, 0, 4],
+             [0, 0, 0, 0],
+             [0, 1, 2, 0],
+             [0, 2, 1, 0]]
+    grader = _Grader(board)
+    grader.hidden_single()
+    assert grader.broken
+    assert grade(board).tier == "unsolvable"
+
+
+def test_generated_puzzles_grade_as_solved():
+    for seed in range(5):
+        board = generate_sudoku(9, 40, unique=True, seed=seed)
+        assert grade(board).solved
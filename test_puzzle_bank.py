@@ -0,0 +1,46 @@
+import pytest
+
+from puzzle_bank import PuzzleBank, write_bank
+from sudoku_generator import SudokuGenerator
+
+
+def _puzzles(count, seed):
+    found = []
+    for i in range(count):
+        generator = SudokuGenerator(9, 40, seed=seed + i)
+        generator.fill_values()
+        solution = [row[:] for row in generator.get_board()]
+        generator.remove_cells()
+        found.append((generator.get_board(), solution))
+    return found
+
+
+def test_round_trip(tmp_path):
+    tiers = {"easy": _puzzles(3, 0), "hard": _puzzles(2, 10), "empty": []}
+    path = tmp_path / "test.bank"
+    write_bank(str(path), {name: iter(items) for name, items in tiers.items()})
+    with PuzzleBank(str(path)) as bank:
+        assert bank.size == 9
+        for name, items in tiers.items():
+            assert bank.count(name) == len(items)
+            for i, item in enumerate(items):
+                assert bank.get(name, i) == item
+        with pytest.raises(IndexError):
+            bank.get("hard", 2)
+
+
+def test_long_tier_name_rejected(tmp_path):
+    path = tmp_path / "test.bank"
+    with pytest.raises(ValueError):
+        write_bank(str(path), {"impossible": _puzzles(1, 0)})
+    assert not path.exists()
+
+
+def test_wrong_board_shape_rejected(tmp_path):
+    path = tmp_path / "test.bank"
+    puzzle, solution = _puzzles(1, 0)[0]
+    with pytest.raises(ValueError):
+        write_bank(str(path), {"easy": [(puzzle, solution), (puzzle[:8], solution)]})
+    assert not path.exists()
+    with pytest.raises(ValueError):
+        write_bank(str(path), {"easy": [(puzzle, solution)]}, size=4)
@@ -0,0 +1,23 @@
+import pytest
+
+from puzzle_ids import PuzzleCache, normalize_id, parse_id
+
+
+def test_normalize_id_folds_case_and_leading_zeros():
+    assert normalize_id(" 9-HARD-007 ") == "9-hard-7"
+
+
+@pytest.mark.parametrize("puzzle_id", ["49-easy-1", "36-easy-1", "1-easy-1", "9-brutal-1", "9-easy", "nine-easy-1"])
+def test_bad_ids_rejected(puzzle_id):
+    with pytest.raises(ValueError):
+        parse_id(puzzle_id)
+
+
+def test_cache_shares_entries_across_spellings():
+    cache = PuzzleCache(2)
+    first = cache.get("4-easy-5")
+    assert cache.get("4-EASY-05") == first
+    assert cache.stats()["hits"] == 1
+    cache.get("4-easy-6")
+    cache.get("4-easy-7")
+    assert len(cache) == 2 and cache.lookup("4-easy-5") is None
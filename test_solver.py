@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+import solver
+from sudoku_generator import SudokuGenerator, check_board, generate_sudoku, line_to_board
+
+TIME_LIMIT = 10.0
+HARD = "800000000003600000070090200050007000000045700000100030001000068008500010090000400"
+
+
+@pytest.mark.parametrize("engine", sorted(solver.ENGINES))
+@pytest.mark.parametrize("bad", [10, -1, "3", 1.5, True, None])
+def test_bad_givens_rejected(engine, bad):
+    board = line_to_board(HARD)
+    board[0][0] = bad
+    with pytest.raises(ValueError):
+        solver.solve(board, engine)
+    with pytest.raises(ValueError):
+        solver.count_solutions(board, 2, engine)
+
+
+@pytest.mark.parametrize("engine", sorted(solver.ENGINES))
+def test_ragged_board_rejected(engine):
+    board = line_to_board(HARD)
+    board[3] = board[3][:8]
+    with pytest.raises(ValueError):
+        solver.solve(board, engine)
+
+
+def test_bulk_line_with_bad_givens_is_unsolved():
+    puzzle, solution, ok = solver._solve_line(("A" + HARD[1:], "bitmask", True))
+    assert solution is None and ok is False
+
+
+@pytest.mark.parametrize("size, removed", [(4, 10), (9, 50), (16, 120), (16, 158)])
+def test_engines_agree(size, removed):
+    # 16x16 with 158 blanks is batch_generate's "hard"; each engine gets TIME_LIMIT seconds per board
+    for seed in range(3):
+        board = generate_sudoku(size, removed, seed=seed)
+        results = {}
+        for name, engine in solver.ENGINES.items():
+            start = time.perf_counter()
+            results[name] = engine([row[:] for row in board]).solutions(2)
+            assert time.perf_counter() - start < TIME_LIMIT, (name, seed)
+        counts = {name: len(found) for name, found in results.items()}
+        assert len(set(counts.values())) == 1, counts
+        for found in results.values():
+            for solution in found:
+                assert check_board(solution)
+                assert all(solution[r][c] == v for r, row in enumerate(board) for c, v in enumerate(row) if v)
+
+
+def test_engines_agree_on_unique_hard_puzzle():
+    board = line_to_board(HARD)
+    solutions = [solver.solve(board, name) for name in sorted(solver.ENGINES)]
+    assert all(solution == solutions[0] for solution in solutions)
+    assert all(solver.count_solutions(board, 2, name) == 1 for name in solver.ENGINES)
+
+
+def test_contradictory_givens_have_no_solution():
+    board = line_to_board(HARD)
+    board[0][1] = board[0][0]
+    for name in solver.ENGINES:
+        assert solver.solve(board, name) is None
+
+
+def test_minimal_puzzle_has_no_removable_given():
+    for seed in range(5):
+        generator = SudokuGenerator(9, 40, seed=seed)
+        generator.fill_values()
+        generator.remove_cells(unique=True, minimal=True)
+        board = generator.get_board()
+        for r, c in [(r, c) for r in range(9) for c in range(9) if board[r][c]]:
+            given = board[r][c]
+            board[r][c] = 0
+            assert solver.count_solutions(board, 2) == 2
+            board[r][c] = given
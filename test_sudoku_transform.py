@@ -0,0 +1,30 @@
+import random
+
+import sudoku_transform
+from solver import count_solutions
+from sudoku_transform import generate_sudoku_fast
+
+
+def _fresh_library():
+    # what a new process starts with
+    sudoku_transform._grids.clear()
+    sudoku_transform._puzzles.clear()
+    sudoku_transform._seeded.clear()
+
+
+def test_seed_repeats_puzzles_with_a_fresh_library():
+    calls = [(9, 45, False), (9, 45, True), (4, 8, True)]
+    first = [generate_sudoku_fast(size, removed, unique, seed=3) for size, removed, unique in calls]
+    first.append(generate_sudoku_fast(9, 50, True, rng=random.Random(4)))
+    _fresh_library()
+    again = [generate_sudoku_fast(size, removed, unique, seed=3) for size, removed, unique in reversed(calls)]
+    again.reverse()
+    again.append(generate_sudoku_fast(9, 50, True, rng=random.Random(4)))
+    assert again == first
+
+
+def test_unique_puzzles_have_one_solution():
+    for seed in range(5):
+        board = generate_sudoku_fast(9, 50, True, seed=seed)
+        assert sum(v == 0 for row in board for v in row) == 50
+        assert count_solutions(board, 2) == 1
@@ -0,0 +1,36 @@
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+import cell
+import glyphs
+import table
+
+
+@pytest.fixture
+def screen():
+    pygame.init()
+    yield pygame.display.set_mode((720, 800))
+    glyphs.clear() # Cached fonts die with pygame.quit()
+    pygame.quit()
+
+
+@pytest.mark.parametrize("n_cells, cell_size", [(9, (60, 60)), (16, (40, 40))])
+def test_table_draws_any_grid_size(monkeypatch, screen, n_cells, cell_size):
+    monkeypatch.setattr(table, "N_CELLS", n_cells)
+    monkeypatch.setattr(table, "CELL_SIZE", cell_size)
+    monkeypatch.setattr(table, "GRID_SIZE", n_cells * cell_size[0])
+    monkeypatch.setattr(cell, "N_CELLS", n_cells)
+    board = table.Table(screen)
+    assert board.SRN * board.SRN == n_cells
+    # pencil-mark every candidate of one empty cell, so the marks layout is drawn in full
+    row, col = next((r, c) for r in range(n_cells) for c in range(n_cells) if not board.answerable_table[r][c])
+    board.game.select(row, col)
+    for num in board.game.candidates(row, col):
+        assert board.game.note(num)
+    board.update()
+    marks = board.grid[row][col].guesses
+    assert len(marks) == n_cells and sorted(v for v in marks if v) == board.game.candidates(row, col)